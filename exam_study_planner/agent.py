@@ -22,6 +22,7 @@ COORDINATOR_INSTRUCTION = """You are the Exam Study Planner Coordinator.
 - Survey -> ProfilerAgent
 - PDF uploaded -> DocumentInterpreterAgent
 - Generate schedule -> OptimizerAgent
+- Logging study done / replanning -> OptimizerAgent
 
 ## Communication
 - Be friendly and reassuring
@@ -5,6 +5,7 @@ from ..tools.document_tools import (
     list_topics,
     clear_topics,
 )
+from ..tools.catalog_tools import list_courses, load_course
 
 
 DOCUMENT_INTERPRETER_INSTRUCTION = """Process documents to extract study topics.
@@ -12,11 +13,18 @@ DOCUMENT_INTERPRETER_INSTRUCTION = """Process documents to extract study topics.
 ## Available tools:
 - clear_topics() - IMPORTANT!!!: Call this first if reprocessing or if there are old topics
 - process_document(file_path, subject) - Extract topics from a PDF
+- process_document(file_path, subject, mode="fast", page_budget=60) - For huge books (500+ pages):
+  reads only a sample of pages and gives a range for the hour estimates. Re-run with mode="full"
+  later to refine - it replaces that document's topics.
 - list_topics() - Show all current topics
+- list_courses() / load_course(course) - Use a course's precompiled topics from the shared catalog
+  (no PDF needed). process_document also uses the catalog automatically for documents it has.
 
 ## Workflow:
 1. If user says "clear" or "restart" or there are too many topics: call clear_topics()
+   If the user names their course, try load_course(course) first.
 2. For each PDF: call process_document(file_path="...", subject="Subject Name")
+   - Several PDFs can be processed at once - issue the process_document calls in parallel
 3. Report results and return to coordinator
 
 Example:
@@ -35,6 +43,8 @@ document_interpreter_agent = LlmAgent(
         clear_topics,
         process_document,
         list_topics,
+        list_courses,
+        load_course,
     ],
     output_key="document_output",
 )
@@ -6,10 +6,19 @@ from google.adk.agents import LlmAgent
 
 from ..tools.optimization_tools import (
     generate_schedule,
+    extend_schedule,
     export_schedule_csv,
     export_schedule_markdown,
     add_exam,
 )
+from ..tools.availability_tools import (
+    set_study_hours,
+    add_busy_time,
+    get_availability,
+    clear_availability,
+)
+from ..tools.scenario_tools import compare_scenarios
+from ..tools.progress_tools import log_study_session, get_progress
 
 
 _today = date.today().isoformat()
@@ -22,7 +31,45 @@ Today's date is {_today}. Always use today as the start_date unless the user spe
 generate_schedule(start_date="{_today}", end_date="YYYY-MM-DD")
 ```
 
-This distributes all topics proportionally across available days, putting harder topics during peak hours.
+This distributes all topics proportionally across available days.
+
+If the user wants the best possible plan (every topic covered, hard topics in their peak hours), use:
+```
+generate_schedule(start_date="{_today}", end_date="YYYY-MM-DD", mode="optimal", time_limit_seconds=10)
+```
+It returns the best plan found within the time limit (never worse than the default plan).
+
+For long plans (several months or more), plan the first weeks only:
+```
+generate_schedule(start_date="{_today}", end_date="YYYY-MM-DD", horizon_days=14)
+```
+Then call extend_schedule(days=14) whenever the user wants to see further ahead.
+
+## Availability (before generating):
+If the user mentions when they can or can't study, record it first:
+- set_study_hours(days=["weekdays"], start_time="17:00", end_time="22:00") - regular study window
+- add_busy_time(label="Lectures", weekday="Tuesday", start_time="09:00", end_time="11:00") - recurring blocks
+- add_busy_time(label="Holiday", date="YYYY-MM-DD", end_date="YYYY-MM-DD") - whole days off
+- get_availability(start_date, end_date) - check free hours
+
+Sessions are only placed in free time. Default is 08:00-22:00 every day with a 12:00-13:00 lunch break.
+
+## What-if questions:
+For "what if I study 5 hours instead of 6" or "what if I start Monday", do NOT regenerate. Use:
+```
+compare_scenarios(max_daily_hours=[5, 6], start_dates=["YYYY-MM-DD"], end_dates=["YYYY-MM-DD"])
+```
+Every combination is compared (coverage per subject, finish date, unscheduled hours) without touching the current schedule.
+Only call generate_schedule once the user picks an option.
+
+## Progress:
+When the user reports studying (or skipping) something, log it:
+- log_study_session(topic="Topic title", minutes=60) - completed study time
+- log_study_session(topic="Topic title", minutes=60, status="missed") - a planned session that was skipped
+- log_study_session(topic="Topic title", minutes=30, finished=True) - topic fully done
+- get_progress() - hours done and remaining per subject
+
+generate_schedule only plans the work that is left, so after logging progress just generate again from today.
 
 ## Export with:
 ```
@@ -45,9 +92,17 @@ optimizer_agent = LlmAgent(
     instruction=OPTIMIZER_INSTRUCTION,
     tools=[
         generate_schedule,
+        extend_schedule,
         export_schedule_markdown,
         export_schedule_csv,
         add_exam,
+        set_study_hours,
+        add_busy_time,
+        get_availability,
+        clear_availability,
+        compare_scenarios,
+        log_study_session,
+        get_progress,
     ],
     output_key="optimizer_output",
 )
@@ -27,7 +27,9 @@ PROFILER_INSTRUCTION = """You help understand a student's study capacity and pea
 
 The profile affects:
 - How many hours per day get scheduled
-- When difficult topics are placed (during peak hours)"""
+- When difficult topics are placed (during peak hours)
+- How much time each subject gets - if the student says they're strong or weak in a subject,
+  use `update_subject_confidence(subject, confidence)` (0 = lost, 0.5 = average, 1 = confident)"""
 
 
 profiler_agent = LlmAgent(
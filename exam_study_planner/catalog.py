@@ -0,0 +1,44 @@
+"""Build or inspect the shared course catalog.
+
+    python -m exam_study_planner.catalog build course.cat --doc "PHYS101:Physics:physics.pdf" --doc ...
+    python -m exam_study_planner.catalog show course.cat
+
+Point workers at the file with EXAM_PLANNER_CATALOG=course.cat.
+"""
+
+import argparse
+
+from .tools.catalog_tools import CourseCatalog, build_catalog
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build or inspect a shared course catalog")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="ingest PDFs into a catalog (existing documents are kept)")
+    build.add_argument("path")
+    build.add_argument("--doc", action="append", required=True, metavar="COURSE:SUBJECT:PDF")
+    build.add_argument("--mode", choices=["full", "fast"], default="full")
+    build.add_argument("--page-budget", type=int, default=60)
+
+    show = sub.add_parser("show", help="list a catalog's documents")
+    show.add_argument("path")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        docs = []
+        for spec in args.doc:
+            parts = spec.split(":", 2)
+            if len(parts) != 3:
+                parser.error(f"--doc must be COURSE:SUBJECT:PDF, got {spec}")
+            docs.append(tuple(parts))
+        stats = build_catalog(args.path, docs, args.mode, args.page_budget)
+        print(f"{args.path}: {stats['documents']} documents, {stats['topics']} topics, {stats['bytes']} bytes")
+    else:
+        catalog = CourseCatalog(args.path)
+        for d in catalog.documents():
+            print(f"{d['course']:12s} {d['doc_id']}  {d['subject']:16s} {d['topic_count']:4d} topics  {d['filename']}")
+
+
+if __name__ == "__main__":
+    main()
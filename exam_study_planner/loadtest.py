@@ -0,0 +1,287 @@
+"""Offline load test - runs the real agent tree against a scripted stand-in model.
+
+No Gemini calls: every agent's model is swapped for ScriptedLlm, which emits the
+transfers and tool calls a real conversation would (survey, PDF processing,
+schedule generation), so only the agent framework and our tools do real work.
+
+    python -m exam_study_planner.loadtest --sessions 50 --concurrency 10
+    python -m exam_study_planner.loadtest --pdf physics.pdf --pdf chem.pdf --json
+"""
+
+from typing import AsyncGenerator, Dict, List
+from datetime import date, timedelta
+import argparse
+import asyncio
+import base64
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from .agent import root_agent
+from .tools.optimization_tools import schedule_cache_stats
+
+
+APP_NAME = "exam_study_planner_loadtest"
+_SESSION_TAG = re.compile(r"\[loadtest session=([\w-]+)\]")
+_AGENT_NAME = re.compile(r'Your internal name is "(\w+)"')
+
+
+def build_script(filenames: List[str], subjects: List[str], export: bool, extra_days: int = 0) -> List[tuple]:
+    """One session's conversation as (agent, [function calls]) turns; empty calls = final text.
+
+    extra_days lengthens the planning period, so sessions given different values
+    miss the shared schedule cache the way real students with different dates do.
+    """
+    start = date.today()
+    end = start + timedelta(days=30 + extra_days)
+    dates = {"start_date": start.isoformat(), "end_date": end.isoformat()}
+
+    def transfer(agent):
+        return ("transfer_to_agent", {"agent_name": agent})
+
+    script = [
+        ("CoordinatorAgent", [transfer("ProfilerAgent")]),
+        ("ProfilerAgent", [("start_study_survey", {})]),
+        ("ProfilerAgent", [("process_survey_response", {"question_id": "focus_duration", "answer": "c"})]),
+        ("ProfilerAgent", [("process_survey_response", {"question_id": "peak_time", "answer": "a"})]),
+        ("ProfilerAgent", [("calculate_profile_scores", {})]),
+        ("ProfilerAgent", [transfer("CoordinatorAgent")]),
+        ("CoordinatorAgent", [transfer("DocumentInterpreterAgent")]),
+        # all documents in one turn, as parallel function calls
+        ("DocumentInterpreterAgent", [
+            ("process_document", {"file_path": f, "subject": s}) for f, s in zip(filenames, subjects)
+        ]),
+        ("DocumentInterpreterAgent", [("list_topics", {})]),
+        ("DocumentInterpreterAgent", [transfer("CoordinatorAgent")]),
+        ("CoordinatorAgent", [transfer("OptimizerAgent")]),
+        ("OptimizerAgent", [("generate_schedule", dates)]),
+        # the model often repeats this call - should be a cache hit
+        ("OptimizerAgent", [("generate_schedule", dates)]),
+    ]
+    if export:
+        script.append(("OptimizerAgent", [("export_schedule_csv", {})]))
+    script.append(("OptimizerAgent", []))
+    return script
+
+
+class ScriptedLlm(BaseLlm):
+    """Stand-in model that plays back build_script() turns, one script and cursor per session."""
+
+    model: str = "scripted"
+    scripts: Dict[str, List[tuple]] = {}
+    cursors: Dict[str, int] = {}
+    mismatches: int = 0
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        session = _find(_SESSION_TAG, _request_text(llm_request))
+        agent = _find(_AGENT_NAME, str(llm_request.config.system_instruction or ""))
+
+        step = self.cursors.get(session, 0)
+        self.cursors[session] = step + 1
+
+        script = self.scripts.get(session, [])
+        if step < len(script):
+            expected, calls = script[step]
+        else:
+            expected, calls = agent, []
+
+        # if the framework routed somewhere unexpected, end the turn rather than loop
+        if expected != agent or any(name not in llm_request.tools_dict for name, _ in calls):
+            self.mismatches += 1
+            calls = []
+
+        if calls:
+            parts = [types.Part.from_function_call(name=name, args=args) for name, args in calls]
+        else:
+            parts = [types.Part.from_text(text="Your schedule is ready.")]
+        yield LlmResponse(
+            content=types.Content(role="model", parts=parts),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=0, candidates_token_count=0, total_token_count=0),
+        )
+
+
+def _request_text(llm_request: LlmRequest) -> str:
+    return " ".join(p.text for c in llm_request.contents for p in (c.parts or []) if p.text)
+
+
+def _find(pattern: re.Pattern, text: str) -> str:
+    match = pattern.search(text)
+    return match.group(1) if match else ""
+
+
+def _walk(agent):
+    yield agent
+    for sub in agent.sub_agents:
+        yield from _walk(sub)
+
+
+def _make_pdf(path: str, pages: int, chapters: int = 12) -> None:
+    import fitz
+    doc = fitz.open()
+    toc = []
+    for p in range(pages):
+        page = doc.new_page()
+        if p % max(1, pages // chapters) == 0:
+            title = f"Chapter {len(toc) + 1} Synthetic Topic"
+            page.insert_text((72, 72), title, fontsize=20)
+            toc.append([1, title, p + 1])
+        page.insert_text((72, 120), "\n".join(["The force F = m a is defined as mass times acceleration."] * 30), fontsize=10)
+    doc.set_toc(toc)
+    doc.save(path)
+    doc.close()
+
+
+def _percentiles(values: List[float]) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {"count": len(values), "p50_ms": pick(0.5), "p90_ms": pick(0.9), "p99_ms": pick(0.99), "max_ms": round(ordered[-1] * 1000, 1)}
+
+
+async def run_load_test(pdfs: List[str], sessions: int, concurrency: int, upload: bool, export: bool) -> dict:
+    filenames = [os.path.basename(p) for p in pdfs]
+    subjects = [os.path.splitext(f)[0].replace("_", " ").title() for f in filenames]
+    uploads = {}
+    if upload:
+        for path, name in zip(pdfs, filenames):
+            with open(path, "rb") as f:
+                uploads[name] = base64.b64encode(f.read()).decode()
+
+    llm = ScriptedLlm()
+    tool_times: Dict[str, List[float]] = {}
+    started: Dict[str, float] = {}
+
+    def before_tool(tool, args, tool_context):
+        started[tool_context.function_call_id] = time.perf_counter()
+
+    def after_tool(tool, args, tool_context, tool_response):
+        elapsed = time.perf_counter() - started.pop(tool_context.function_call_id, time.perf_counter())
+        # cache hits are timed apart, so they don't hide the scheduler's own latency
+        name = tool.name
+        if isinstance(tool_response, dict) and tool_response.get("cached"):
+            name += " (cached)"
+        tool_times.setdefault(name, []).append(elapsed)
+
+    for agent in _walk(root_agent):
+        agent.model = llm
+        agent.before_tool_callback = before_tool
+        agent.after_tool_callback = after_tool
+
+    session_service = InMemorySessionService()
+    runner = Runner(agent=root_agent, app_name=APP_NAME, session_service=session_service)
+    gate = asyncio.Semaphore(concurrency)
+    session_times: List[float] = []
+    state_sizes: List[int] = []
+    errors: List[str] = []
+
+    async def one_session(index: int):
+        async with gate:
+            session_id = uuid.uuid4().hex[:12]
+            # a period of its own per session: the first generate_schedule is a
+            # real cache miss, the scripted repeat right after it a hit
+            llm.scripts[session_id] = build_script(filenames if upload else pdfs, subjects, export, extra_days=index)
+            await session_service.create_session(
+                app_name=APP_NAME, user_id="loadtest", session_id=session_id,
+                state={"uploaded_files": uploads} if uploads else {},
+            )
+            message = types.Content(role="user", parts=[types.Part.from_text(
+                text=f"[loadtest session={session_id}] Plan my exams from the uploaded PDFs.")])
+
+            t0 = time.perf_counter()
+            async for event in runner.run_async(user_id="loadtest", session_id=session_id, new_message=message):
+                for resp in event.get_function_responses():
+                    if isinstance(resp.response, dict) and resp.response.get("status") == "error":
+                        errors.append(f"{resp.name}: {resp.response.get('message')}")
+            session_times.append(time.perf_counter() - t0)
+
+            session = await session_service.get_session(app_name=APP_NAME, user_id="loadtest", session_id=session_id)
+            state = {k: v for k, v in session.state.items() if k != "uploaded_files"}
+            state_sizes.append(len(json.dumps(state, default=str)))
+            llm.cursors.pop(session_id, None)
+            llm.scripts.pop(session_id, None)
+
+    t_start = time.perf_counter()
+    await asyncio.gather(*(one_session(i) for i in range(sessions)))
+    wall = time.perf_counter() - t_start
+
+    tool_calls = sum(len(v) for v in tool_times.values())
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "documents_per_session": len(pdfs),
+        "wall_seconds": round(wall, 2),
+        "throughput": {
+            "sessions_per_second": round(sessions / wall, 2),
+            "tool_calls_per_second": round(tool_calls / wall, 1),
+        },
+        "session_latency": _percentiles(session_times),
+        "tool_latency": {name: _percentiles(times) for name, times in sorted(tool_times.items())},
+        "state_bytes": {
+            "mean": round(sum(state_sizes) / len(state_sizes)) if state_sizes else 0,
+            "max": max(state_sizes, default=0),
+        },
+        "schedule_cache": schedule_cache_stats(),
+        "script_mismatches": llm.mismatches,
+        "tool_errors": errors[:10],
+    }
+
+
+def _print_report(report: dict) -> None:
+    print(f"{report['sessions']} sessions x {report['documents_per_session']} PDFs, "
+          f"concurrency {report['concurrency']}, {report['wall_seconds']}s wall")
+    print(f"throughput: {report['throughput']['sessions_per_second']} sessions/s, "
+          f"{report['throughput']['tool_calls_per_second']} tool calls/s")
+    s = report["session_latency"]
+    print(f"session latency: p50 {s['p50_ms']}ms  p90 {s['p90_ms']}ms  p99 {s['p99_ms']}ms  max {s['max_ms']}ms")
+    print("tool latency:")
+    for name, t in report["tool_latency"].items():
+        print(f"  {name:37s} n={t['count']:<5d} p50 {t['p50_ms']:>8}ms  p90 {t['p90_ms']:>8}ms  p99 {t['p99_ms']:>8}ms")
+    print(f"state size: mean {report['state_bytes']['mean']} B, max {report['state_bytes']['max']} B (excluding uploads)")
+    print(f"schedule cache hit rate: {report['schedule_cache']['hit_rate']}")
+    if report["script_mismatches"] or report["tool_errors"]:
+        print(f"script mismatches: {report['script_mismatches']}, tool errors: {report['tool_errors']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--pdf", action="append", default=[], help="PDF to ingest per session (repeatable)")
+    parser.add_argument("--pages", type=int, default=300, help="pages per synthetic PDF when no --pdf is given")
+    parser.add_argument("--no-upload", action="store_true", help="read PDFs from disk instead of session uploads")
+    parser.add_argument("--export", action="store_true", help="also export the CSV (writes study_schedule.csv)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdfs = args.pdf
+        if not pdfs:
+            pdfs = [os.path.join(tmp, f"{name}.pdf") for name in ("physics", "history")]
+            for path in pdfs:
+                _make_pdf(path, args.pages)
+
+        report = asyncio.run(run_load_test(pdfs, args.sessions, args.concurrency, not args.no_upload, args.export))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
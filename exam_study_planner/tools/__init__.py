@@ -11,10 +11,20 @@ from .document_tools import (
 )
 from .optimization_tools import (
     generate_schedule,
+    extend_schedule,
     export_schedule_csv,
     export_schedule_markdown,
     add_exam,
 )
+from .availability_tools import (
+    set_study_hours,
+    add_busy_time,
+    get_availability,
+    clear_availability,
+)
+from .scenario_tools import compare_scenarios
+from .catalog_tools import list_courses, load_course
+from .progress_tools import log_study_session, get_progress
 
 __all__ = [
     # Survey tools
@@ -28,7 +38,21 @@ __all__ = [
     "clear_topics",
     # Optimization tools
     "generate_schedule",
+    "extend_schedule",
     "export_schedule_csv",
     "export_schedule_markdown",
     "add_exam",
+    # Availability tools
+    "set_study_hours",
+    "add_busy_time",
+    "get_availability",
+    "clear_availability",
+    # Scenario tools
+    "compare_scenarios",
+    # Catalog tools
+    "list_courses",
+    "load_course",
+    # Progress tools
+    "log_study_session",
+    "get_progress",
 ]
@@ -0,0 +1,282 @@
+"""Availability calendar - when the learner can actually study."""
+
+from typing import List, Tuple
+from google.adk.tools import ToolContext
+from datetime import date, datetime, timedelta
+import hashlib
+
+from .state_utils import update_state
+
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# used until the learner sets their own hours: 08:00-22:00 with 12:00-13:00 off for lunch
+DEFAULT_WINDOWS = [[8 * 60, 12 * 60], [13 * 60, 22 * 60]]
+
+_DAY_ALIASES = {
+    "weekdays": WEEKDAYS[:5],
+    "weekends": WEEKDAYS[5:],
+    "weekend": WEEKDAYS[5:],
+    "every day": WEEKDAYS,
+    "everyday": WEEKDAYS,
+    "daily": WEEKDAYS,
+}
+
+
+class IntervalTree:
+    """Static interval tree over half-open [start, end) minute intervals.
+
+    Intervals are sorted by start and laid out as an implicit balanced BST
+    (each range's midpoint is its root). Every node stores the largest end in
+    its subtree, so overlap queries prune whole subtrees and run in O(log n + k).
+    """
+
+    def __init__(self, intervals: List[Tuple[int, int, str]]):
+        items = sorted(intervals)
+        self._starts = [s for s, _, _ in items]
+        self._ends = [e for _, e, _ in items]
+        self._labels = [label for _, _, label in items]
+        self._max_end = [0] * len(items)
+        if items:
+            self._build(0, len(items))
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _build(self, lo: int, hi: int) -> int:
+        mid = (lo + hi) // 2
+        max_end = self._ends[mid]
+        if lo < mid:
+            max_end = max(max_end, self._build(lo, mid))
+        if mid + 1 < hi:
+            max_end = max(max_end, self._build(mid + 1, hi))
+        self._max_end[mid] = max_end
+        return max_end
+
+    def overlapping(self, lo: int, hi: int) -> List[Tuple[int, int, str]]:
+        """All intervals overlapping [lo, hi), ordered by start."""
+        found = []
+        stack = [(0, len(self._starts))]
+        while stack:
+            a, b = stack.pop()
+            if a >= b:
+                continue
+            mid = (a + b) // 2
+            if self._max_end[mid] <= lo:
+                continue  # nothing in this subtree reaches the query window
+            stack.append((a, mid))
+            if self._starts[mid] < hi:
+                if self._ends[mid] > lo:
+                    found.append((self._starts[mid], self._ends[mid], self._labels[mid]))
+                stack.append((mid + 1, b))
+        found.sort()
+        return found
+
+
+class AvailabilityCalendar:
+    """Weekly study windows minus recurring and dated busy blocks."""
+
+    def __init__(self, availability: dict = None):
+        availability = availability or {}
+        weekly = availability.get("weekly", {})
+        self.weekly = {d: [tuple(w) for w in weekly.get(d, DEFAULT_WINDOWS)] for d in WEEKDAYS}
+
+        self.weekly_busy = {d: [] for d in WEEKDAYS}
+        for b in availability.get("weekly_busy", {}).values():
+            self.weekly_busy[b["weekday"]].append((_parse_time(b["start"]), _parse_time(b["end"])))
+
+        # dated blocks (holidays, exams, one-off events) can number in the thousands
+        # for imported calendars, so they go in the tree keyed by absolute minute
+        self.busy = IntervalTree([
+            (_abs_minute(b["start"]), _abs_minute(b["end"]), b.get("label", ""))
+            for b in availability.get("busy", {}).values()
+        ])
+
+    def free_windows(self, day: date) -> List[Tuple[int, int]]:
+        """Free [start, end) minutes-of-day for a date, in order."""
+        windows = self.weekly[WEEKDAYS[day.weekday()]]
+        blocked = list(self.weekly_busy[WEEKDAYS[day.weekday()]])
+
+        day_start = day.toordinal() * 1440
+        for s, e, _ in self.busy.overlapping(day_start, day_start + 1440):
+            blocked.append((max(0, s - day_start), min(1440, e - day_start)))
+
+        return _subtract(windows, blocked) if blocked else list(windows)
+
+    def free_hours(self, day: date) -> float:
+        return sum(e - s for s, e in self.free_windows(day)) / 60
+
+
+def _subtract(windows, blocked) -> List[Tuple[int, int]]:
+    """Remove blocked intervals from sorted windows."""
+    free = []
+    blocked = sorted(blocked)
+    for ws, we in windows:
+        cursor = ws
+        for bs, be in blocked:
+            if be <= cursor or bs >= we:
+                continue
+            if bs > cursor:
+                free.append((cursor, bs))
+            cursor = max(cursor, be)
+        if cursor < we:
+            free.append((cursor, we))
+    return free
+
+
+def _parse_time(value: str) -> int:
+    """'HH:MM' -> minutes since midnight (24:00 allowed as end of day)."""
+    hours, minutes = value.strip().split(":")
+    total = int(hours) * 60 + int(minutes)
+    if not 0 <= total <= 1440 or not 0 <= int(minutes) < 60:
+        raise ValueError(f"Invalid time: {value}")
+    return total
+
+
+def _abs_minute(value: str) -> int:
+    """'YYYY-MM-DD HH:MM' -> minutes since 0001-01-01."""
+    day, _, clock = value.partition(" ")
+    return datetime.strptime(day, "%Y-%m-%d").toordinal() * 1440 + _parse_time(clock or "00:00")
+
+
+def _parse_days(days: List[str]) -> List[str]:
+    parsed = []
+    for d in days:
+        key = d.strip().lower()
+        if key in _DAY_ALIASES:
+            parsed.extend(_DAY_ALIASES[key])
+            continue
+        match = next((w for w in WEEKDAYS if w.lower().startswith(key[:3])), None) if len(key) >= 3 else None
+        if match is None:
+            raise ValueError(f"Unknown day: {d}")
+        parsed.append(match)
+    return list(dict.fromkeys(parsed))
+
+
+def set_study_hours(days: List[str], start_time: str, end_time: str, tool_context: ToolContext) -> dict:
+    """Set the study window (HH:MM-HH:MM) for weekdays, e.g. ["weekdays"] or ["Sat", "Sun"]. Equal times mark a day off."""
+    try:
+        weekdays = _parse_days(days)
+        start, end = _parse_time(start_time), _parse_time(end_time)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    if end < start:
+        return {"status": "error", "message": "end_time must be after start_time"}
+
+    def _set(availability):
+        weekly = availability.setdefault("weekly", {})
+        for d in weekdays:
+            weekly[d] = [[start, end]] if end > start else []
+    update_state(tool_context, "availability", _set)
+
+    when = f"{start_time}-{end_time}" if end > start else "off"
+    return {"status": "success", "message": f"Set {', '.join(weekdays)} to {when}"}
+
+
+def add_busy_time(
+    label: str,
+    tool_context: ToolContext,
+    date: str = "",
+    end_date: str = "",
+    start_time: str = "",
+    end_time: str = "",
+    weekday: str = "",
+) -> dict:
+    """Block out time. Use weekday for recurring blocks (lectures), date/end_date for one-offs; no times = whole days (holidays)."""
+    try:
+        start = _parse_time(start_time) if start_time else 0
+        end = _parse_time(end_time) if end_time else 1440
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+
+    if weekday:
+        try:
+            days = _parse_days([weekday])
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        if end <= start:
+            return {"status": "error", "message": "end_time must be after start_time"}
+        blocks = [{"label": label, "weekday": d, "start": _fmt_time(start), "end": _fmt_time(end)} for d in days]
+        _add_blocks(tool_context, "weekly_busy", blocks)
+        return {"status": "success", "message": f"Blocked {label} every {', '.join(days)} {_fmt_time(start)}-{_fmt_time(end)}"}
+
+    if not date:
+        return {"status": "error", "message": "Give either a date or a weekday"}
+
+    try:
+        first = datetime.strptime(date, "%Y-%m-%d")
+        last = datetime.strptime(end_date, "%Y-%m-%d") if end_date else first
+    except ValueError:
+        return {"status": "error", "message": "Use YYYY-MM-DD format"}
+
+    # end_time belongs to the last day; 24:00 rolls over to the following midnight
+    last_end = last + timedelta(minutes=end)
+    block_start = first + timedelta(minutes=start)
+    if last_end <= block_start:
+        return {"status": "error", "message": "Busy block must end after it starts"}
+
+    block = {
+        "label": label,
+        "start": block_start.strftime("%Y-%m-%d %H:%M"),
+        "end": last_end.strftime("%Y-%m-%d %H:%M"),
+    }
+    _add_blocks(tool_context, "busy", [block])
+
+    return {"status": "success", "message": f"Blocked {label} from {block['start']} to {block['end']}"}
+
+
+def _add_blocks(tool_context: ToolContext, kind: str, blocks: List[dict]) -> None:
+    """Store busy blocks keyed by content hash so parallel calls merge (and repeats are no-ops)."""
+    def _add(availability):
+        stored = availability.setdefault(kind, {})
+        for b in blocks:
+            key = hashlib.md5("|".join(b[k] for k in sorted(b)).encode()).hexdigest()[:10]
+            stored[key] = b
+    update_state(tool_context, "availability", _add)
+
+
+def get_availability(tool_context: ToolContext, start_date: str = "", end_date: str = "") -> dict:
+    """Show the weekly study windows and busy blocks, plus free hours for a date range if given."""
+    availability = tool_context.state.get("availability", {})
+    calendar = AvailabilityCalendar(availability)
+
+    weekly = {}
+    for d in WEEKDAYS:
+        windows = _subtract(calendar.weekly[d], calendar.weekly_busy[d])
+        weekly[d] = [f"{_fmt_time(s)}-{_fmt_time(e)}" for s, e in windows] or ["off"]
+
+    result = {
+        "status": "success",
+        "weekly": weekly,
+        "recurring_blocks": len(availability.get("weekly_busy", {})),
+        "dated_blocks": len(calendar.busy),
+    }
+
+    if start_date and end_date:
+        try:
+            current = datetime.strptime(start_date, "%Y-%m-%d").date()
+            end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        except ValueError:
+            return {"status": "error", "message": "Use YYYY-MM-DD format"}
+        total = 0.0
+        days_off = 0
+        while current <= end:
+            hours = calendar.free_hours(current)
+            total += hours
+            days_off += hours == 0
+            current += timedelta(days=1)
+        result["free_hours"] = round(total, 1)
+        result["days_off"] = days_off
+
+    return result
+
+
+def clear_availability(tool_context: ToolContext) -> dict:
+    """Reset to the default study hours with no busy blocks."""
+    tool_context.state["availability"] = {}
+    return {"status": "success", "message": "Availability reset to 08:00-22:00 daily with a lunch break"}
+
+
+def _fmt_time(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
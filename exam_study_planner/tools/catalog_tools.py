@@ -0,0 +1,256 @@
+"""Shared course catalog - topics ingested once per document, read by every session.
+
+The catalog is a single read-only file that every worker memory-maps, so the
+OS keeps one copy of it in the page cache however many processes and sessions
+use it. Sessions only store references to catalog documents (plus their own
+subject name); topics are decoded from the mapping on demand. Documents are
+matched by a hash of the PDF bytes, never by name.
+
+Build one with `python -m exam_study_planner.catalog`; workers find the file
+through EXAM_PLANNER_CATALOG.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from google.adk.tools import ToolContext
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+
+from .state_utils import update_state
+
+
+CATALOG_ENV = "EXAM_PLANNER_CATALOG"
+
+# layout: header | doc records | topic records | utf-8 string blob
+_MAGIC = b"ESPCAT02"
+_HEADER = struct.Struct("<8sIII")         # magic, docs, topics, string blob offset
+_DOC = struct.Struct("<8s16s6I3I")        # doc_id, content hash, (offset, length) x course/filename/subject, pages, first topic, topic count
+_TOPIC = struct.Struct("<2I2I4f")         # title (offset, length), first/last page, hours, complexity, hours range (NaN = none)
+
+_open_catalogs = {}
+_open_lock = threading.Lock()
+
+
+class CourseCatalog:
+    """Read-only view of a catalog file. Only the small doc index is decoded up front."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, n_docs, n_topics, self._strings = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC:
+            self._buf.close()
+            raise ValueError(f"Not a course catalog: {path}")
+        self._topics_at = _HEADER.size + n_docs * _DOC.size
+        self.topic_count = n_topics
+
+        self._docs = {}
+        self._by_hash = {}
+        for i in range(n_docs):
+            rec = _DOC.unpack_from(self._buf, _HEADER.size + i * _DOC.size)
+            doc_id = rec[0].decode("ascii")
+            self._docs[doc_id] = {
+                "doc_id": doc_id,
+                "content_hash": rec[1].hex(),
+                "course": self._string(rec[2], rec[3]),
+                "filename": self._string(rec[4], rec[5]),
+                "subject": self._string(rec[6], rec[7]),
+                "total_pages": rec[8],
+                "first_topic": rec[9],
+                "topic_count": rec[10],
+            }
+            self._by_hash[rec[1].hex()] = doc_id
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docs
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def find(self, content_hash: str) -> Optional[str]:
+        """doc_id of the catalog document with these exact PDF bytes, if any."""
+        return self._by_hash.get(content_hash)
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings + offset
+        return self._buf[start:start + length].decode("utf-8")
+
+    def documents(self, course: str = "") -> List[dict]:
+        return [dict(d) for d in self._docs.values() if not course or d["course"] == course]
+
+    def topics(self, doc_id: str, subject: str = "") -> List[dict]:
+        """Topics of one document, in the same shape process_document stores."""
+        doc = self._docs[doc_id]
+        subject = subject or doc["subject"]
+        topics = []
+        for i in range(doc["topic_count"]):
+            at = self._topics_at + (doc["first_topic"] + i) * _TOPIC.size
+            title_off, title_len, first, last, hours, complexity, low, high = _TOPIC.unpack_from(self._buf, at)
+            topic = {
+                "topic_id": f"{doc_id}_{i:02d}",
+                "subject": subject,
+                "title": self._string(title_off, title_len),
+                "page_range": [first, last],
+                "estimated_hours": round(hours, 1),
+                "complexity": round(complexity, 2),
+            }
+            if not math.isnan(low):
+                topic["hours_range"] = [round(low, 1), round(high, 1)]
+            topics.append(topic)
+        return topics
+
+    def close(self) -> None:
+        self._buf.close()
+
+
+def open_catalog(path: str = "") -> Optional[CourseCatalog]:
+    """The process-wide catalog (EXAM_PLANNER_CATALOG unless path is given), or None.
+
+    Reopened when the file is rebuilt; the old mapping stays valid for readers
+    that still hold it because builds replace the file instead of rewriting it.
+    """
+    path = path or os.environ.get(CATALOG_ENV, "")
+    if not path:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    with _open_lock:
+        cached = _open_catalogs.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        catalog = CourseCatalog(path)
+        _open_catalogs[path] = (mtime, catalog)
+        return catalog
+
+
+def write_catalog(path: str, entries: List[Tuple[str, dict, List[dict]]]) -> None:
+    """Write (course, document entry, topics) triples as a catalog file, atomically."""
+    strings = bytearray()
+    offsets = {}
+
+    def ref(text: str) -> Tuple[int, int]:
+        data = text.encode("utf-8")
+        if data not in offsets:
+            offsets[data] = len(strings)
+            strings.extend(data)
+        return offsets[data], len(data)
+
+    doc_records = []
+    topic_records = []
+    for course, doc, topics in entries:
+        doc_records.append(_DOC.pack(
+            doc["doc_id"].encode("ascii"), bytes.fromhex(doc["content_hash"]), *ref(course), *ref(doc["filename"]), *ref(doc["subject"]),
+            doc["total_pages"], len(topic_records), len(topics),
+        ))
+        for t in topics:
+            low, high = t.get("hours_range", [math.nan, math.nan])
+            topic_records.append(_TOPIC.pack(
+                *ref(t["title"]), t["page_range"][0], t["page_range"][1],
+                t["estimated_hours"], t["complexity"], low, high,
+            ))
+
+    strings_at = _HEADER.size + len(doc_records) * _DOC.size + len(topic_records) * _TOPIC.size
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(doc_records), len(topic_records), strings_at))
+        f.writelines(doc_records)
+        f.writelines(topic_records)
+        f.write(strings)
+    os.replace(tmp_path, path)
+
+
+def build_catalog(path: str, docs: List[Tuple[str, str, str]], mode: str = "full", page_budget: int = 60) -> dict:
+    """Ingest (course, subject, pdf path) documents into the catalog at path.
+
+    Documents already in an existing catalog at path are kept, so courses can
+    be added one at a time.
+    """
+    import fitz
+    from .document_tools import _doc_id, _ingest
+
+    entries: Dict[str, Tuple[str, dict, List[dict]]] = {}
+    if os.path.exists(path):
+        old = CourseCatalog(path)
+        for d in old.documents():
+            entries[d["doc_id"]] = (d["course"], d, old.topics(d["doc_id"]))
+        old.close()
+
+    for course, subject, pdf_path in docs:
+        filename = os.path.basename(pdf_path)
+        pdf_doc = fitz.open(pdf_path)
+        try:
+            doc_id = _doc_id(filename, len(pdf_doc))
+            document, topics = _ingest(pdf_doc, filename, subject, doc_id, mode, page_budget, 0)
+        finally:
+            pdf_doc.close()
+        document["content_hash"] = _content_hash(pdf_path)
+        entries[doc_id] = (course, document, topics)
+
+    write_catalog(path, list(entries.values()))
+    return {
+        "documents": len(entries),
+        "topics": sum(len(t) for _, _, t in entries.values()),
+        "bytes": os.path.getsize(path),
+    }
+
+
+def _content_hash(path: str) -> str:
+    """First 128 bits of the SHA-256 of a file, as hex."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:32]
+
+
+def list_courses() -> dict:
+    """List the courses and documents in the shared course catalog."""
+    catalog = open_catalog()
+    if catalog is None:
+        return {"status": "error", "message": f"No course catalog configured (set {CATALOG_ENV})"}
+
+    courses = {}
+    for d in catalog.documents():
+        hours = sum(t["estimated_hours"] for t in catalog.topics(d["doc_id"]))
+        courses.setdefault(d["course"], []).append({
+            "filename": d["filename"],
+            "subject": d["subject"],
+            "topics": d["topic_count"],
+            "total_hours": round(hours, 1),
+        })
+    return {"status": "success", "courses": courses}
+
+
+def load_course(course: str, tool_context: ToolContext) -> dict:
+    """Add every document of a catalog course to this session without processing PDFs."""
+    catalog = open_catalog()
+    if catalog is None:
+        return {"status": "error", "message": f"No course catalog configured (set {CATALOG_ENV})"}
+
+    docs = catalog.documents(course)
+    if not docs:
+        return {"status": "error", "message": f"Unknown course: {course}"}
+
+    # only references go into session state; the topics stay in the shared file
+    def _add(refs):
+        for d in docs:
+            refs.setdefault(d["doc_id"], {"subject": d["subject"]})
+    update_state(tool_context, "catalog_docs", _add)
+
+    total_hours = sum(t["estimated_hours"] for d in docs for t in catalog.topics(d["doc_id"]))
+    return {
+        "status": "success",
+        "course": course,
+        "documents": [d["filename"] for d in docs],
+        "topics": sum(d["topic_count"] for d in docs),
+        "total_hours": round(total_hours, 1),
+        "message": f"Loaded {len(docs)} documents for {course} from the course catalog",
+    }
@@ -1,62 +1,101 @@
 """Document processing - extracts topics with estimated study hours."""
 
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
 from google.adk.tools import ToolContext
+import gc
 import re
 import hashlib
+import math
+import os
+import random
+import tempfile
+import time
+
+from .catalog_tools import _content_hash, open_catalog
+from .state_utils import set_entry, update_state, get_topics
+
+
+# Per-worker RSS ceiling for ingestion in MB (0 = no limit). When exceeded, the
+# PyMuPDF object store is flushed; if that isn't enough the document is rejected
+# instead of taking the whole worker down.
+MAX_RSS_MB = int(os.environ.get("EXAM_PLANNER_MAX_RSS_MB", "0"))
+RSS_CHECK_EVERY = 16  # pages
+
+# Heading detection only reads this top fraction of each page
+HEADER_BAND = 0.3
+HEADER_MAX_LINES = 10
+# a line counts as typographically prominent at this multiple of the body font size (or bold)
+HEADING_SIZE_RATIO = 1.15
+
+_HEADING_RE = re.compile(r'^(?:(?P<named>(?i:chapter|unit|module)\s+\d+)|(?P<numbered>\d+\.\s+[A-Z][a-z]))')
+_BOLD_FLAG = 16  # span flag bit for bold fonts
 
 
 def process_document(
     file_path: str,
     subject: str,
     tool_context: ToolContext,
+    mode: str = "full",
+    page_budget: int = 60,
+    time_budget_seconds: float = 0,
 ) -> dict:
-    """Extract topics from PDF with estimated study hours."""
+    """Extract topics from PDF with estimated study hours.
+
+    mode="fast" bounds the cost for huge books: it uses the TOC (or page chunks),
+    reads at most page_budget randomly sampled pages (and stops early after
+    time_budget_seconds if set), and reports a 95% range for every hour estimate.
+    """
     try:
         import fitz
     except ImportError:
         return {"status": "error", "message": "PyMuPDF not installed. Run: pip install pymupdf"}
 
+    if mode not in ("full", "fast"):
+        return {"status": "error", "message": f"Unknown mode: {mode}. Use 'full' or 'fast'"}
+
     filename = file_path.split("/")[-1] if "/" in file_path else file_path
 
     if not filename.lower().endswith('.pdf'):
         return {"status": "error", "message": f"Not a PDF: {filename}"}
 
+    pdf_doc = None
+    spool_path = None
     try:
-        pdf_doc = None
         uploaded = tool_context.state.get("uploaded_files", {})
 
         if filename in uploaded:
-            import base64
-            data = uploaded[filename]
-            if isinstance(data, bytes):
-                pdf_doc = fitz.open(stream=data, filetype="pdf")
-            else:
-                pdf_doc = fitz.open(stream=base64.b64decode(data), filetype="pdf")
+            # spool uploads to disk so the decoded bytes aren't held while parsing
+            spool_path = _spool_upload(uploaded[filename])
+            pdf_doc = fitz.open(spool_path)
         else:
             pdf_doc = fitz.open(file_path)
 
         total_pages = len(pdf_doc)
-        structure = _extract_structure(pdf_doc, total_pages)
-        section_samples = _sample_section_content(pdf_doc, structure)
-        pdf_doc.close()
-
-        topics = _create_topics(structure, section_samples, subject, filename, total_pages, tool_context)
+        doc_id = _doc_id(filename, total_pages)
+
+        # a shared course catalog already has these exact bytes - reference it, don't re-ingest
+        catalog = open_catalog()
+        catalog_id = catalog.find(_content_hash(spool_path or file_path)) if catalog is not None else None
+        if catalog_id:
+            set_entry(tool_context, "catalog_docs", catalog_id, {"subject": subject})
+            # drop a private copy ingested before the catalog existed
+            for key in ("doc_topics", "documents"):
+                for stale in {doc_id, catalog_id}:
+                    update_state(tool_context, key, lambda entries: entries.pop(stale, None))
+            doc_id = catalog_id
+            topics = catalog.topics(doc_id, subject)
+            mode = "catalog"
+        else:
+            document, topics = _ingest(pdf_doc, filename, subject, doc_id, mode, page_budget, time_budget_seconds)
 
-        doc_id = hashlib.md5(f"{filename}_{total_pages}".encode()).hexdigest()[:8]
-        documents = tool_context.state.get("documents", {})
-        documents[doc_id] = {
-            "doc_id": doc_id,
-            "filename": filename,
-            "subject": subject,
-            "total_pages": total_pages,
-            "topics": [t["topic_id"] for t in topics],
-        }
-        tool_context.state["documents"] = documents
+            # keyed by doc_id so parallel process_document calls merge instead of overwriting
+            set_entry(tool_context, "doc_topics", doc_id, topics)
+            set_entry(tool_context, "documents", doc_id, document)
+            pages_read = document["pages_read"]
 
         total_hours = sum(t["estimated_hours"] for t in topics)
 
-        return {
+        result = {
             "status": "success",
             "subject": subject,
             "filename": filename,
@@ -66,12 +105,115 @@ def process_document(
             "topics": [f"{t['title']} ({t['estimated_hours']}h)" for t in topics[:15]],
             "message": f"Found {len(topics)} topics requiring {total_hours:.1f} hours total"
         }
+        if mode == "catalog":
+            result["message"] += " (from the course catalog)"
+        if mode == "fast":
+            low = sum(t["hours_range"][0] for t in topics)
+            high = sum(t["hours_range"][1] for t in topics)
+            result["pages_read"] = pages_read
+            result["total_hours_range"] = [round(low, 1), round(high, 1)]
+            result["message"] += f" (95% range {low:.1f}-{high:.1f}h from {pages_read} sampled pages)"
+        return result
 
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+    finally:
+        if pdf_doc is not None:
+            pdf_doc.close()
+        if spool_path:
+            os.unlink(spool_path)
+
+
+def _doc_id(filename: str, total_pages: int) -> str:
+    return hashlib.md5(f"{filename}_{total_pages}".encode()).hexdigest()[:8]
+
+
+def _ingest(pdf_doc, filename: str, subject: str, doc_id: str, mode: str, page_budget: int,
+            time_budget_seconds: float) -> Tuple[dict, List[dict]]:
+    """Run the page pipeline on an open PDF. Returns (document entry, topics)."""
+    import fitz
+
+    total_pages = len(pdf_doc)
+    guard = _MemoryGuard(fitz, MAX_RSS_MB)
+
+    # page -> features -> section stats -> topic, one page in memory at a time
+    if mode == "fast":
+        structure = _extract_structure(pdf_doc, total_pages, guard, scan_headings=False)
+        stats, pages_read = _sample_complexity(pdf_doc, structure, subject, total_pages, doc_id,
+                                               page_budget, time_budget_seconds, guard)
+    else:
+        structure = _extract_structure(pdf_doc, total_pages, guard)
+        stats = _iter_section_complexity(pdf_doc, structure, subject, guard)
+        pages_read = min(len(structure), total_pages)
+    topics = list(_iter_topics(structure, stats, subject, doc_id, total_pages))
+
+    document = {
+        "doc_id": doc_id,
+        "filename": filename,
+        "subject": subject,
+        "total_pages": total_pages,
+        "ingest_mode": mode,
+        "pages_read": pages_read,
+        "topics": [t["topic_id"] for t in topics],
+    }
+    return document, topics
+
+
+def _spool_upload(data) -> str:
+    """Write an uploaded PDF (bytes or base64) to a temp file and return its path."""
+    import base64
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data if isinstance(data, bytes) else base64.b64decode(data))
+    return f.name
 
-def _extract_structure(pdf_doc, total_pages: int) -> List[dict]:
+
+class _MemoryGuard:
+    """Keeps ingestion under an RSS ceiling by flushing PyMuPDF's cache, then giving up."""
+
+    def __init__(self, fitz, max_rss_mb: int):
+        self.fitz = fitz
+        self.max_rss_mb = max_rss_mb
+        self.pages = 0
+
+    def tick(self) -> None:
+        self.pages += 1
+        if not self.max_rss_mb or self.pages % RSS_CHECK_EVERY:
+            return
+        if _rss_mb() <= self.max_rss_mb:
+            return
+        self.fitz.TOOLS.store_shrink(100)
+        gc.collect()
+        if _rss_mb() > self.max_rss_mb:
+            raise MemoryError(f"Ingestion exceeded {self.max_rss_mb} MB - try mode='fast'")
+
+
+def _rss_mb() -> float:
+    """Current resident set size (peak RSS where /proc isn't available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def _iter_page_text(pdf_doc, page_numbers: Iterable[int], guard: _MemoryGuard, limit: int = 0) -> Iterator[Tuple[int, str]]:
+    """Yield (page number, text) one page at a time; each page object is dropped before the next loads."""
+    total = len(pdf_doc)
+    for page_num in page_numbers:
+        if not 1 <= page_num <= total:
+            continue
+        page = pdf_doc.load_page(page_num - 1)
+        text = page.get_text()
+        del page
+        guard.tick()
+        yield page_num, text[:limit] if limit else text
+
+
+def _extract_structure(pdf_doc, total_pages: int, guard: _MemoryGuard, scan_headings: bool = True) -> List[dict]:
     """Get major sections - chapters/units from TOC or heading patterns."""
     structure = []
 
@@ -92,28 +234,9 @@ def _extract_structure(pdf_doc, total_pages: int) -> List[dict]:
                 if title_lower not in skip_lower and not any(skip in title_lower for skip in skip_lower):
                     structure.append({"title": title_clean, "page": page})
 
-    # If no TOC, scan for chapter headings across ALL pages
-    if len(structure) < 3:
-        patterns = [
-            r'^Chapter\s+\d+',
-            r'^Unit\s+\d+',
-            r'^Module\s+\d+',
-            r'^\d+\.\s+[A-Z][a-z]',
-        ]
-        seen_titles = set()
-
-        for page_num in range(total_pages):
-            text = pdf_doc[page_num].get_text()
-            for line in text.split('\n')[:10]:
-                line = line.strip()
-                if 5 < len(line) < 80 and line.lower() not in skip_lower:
-                    for p in patterns:
-                        if re.match(p, line, re.IGNORECASE):
-                            # deduplicate running headers
-                            if line not in seen_titles:
-                                seen_titles.add(line)
-                                structure.append({"title": line, "page": page_num + 1})
-                            break
+    # If no TOC, scan the top of every page for chapter headings
+    if len(structure) < 3 and scan_headings:
+        structure.extend(_detect_headings(pdf_doc, total_pages, guard, skip_lower))
 
     # Fallback: create chunks by page ranges
     if len(structure) < 2:
@@ -128,14 +251,152 @@ def _extract_structure(pdf_doc, total_pages: int) -> List[dict]:
     return structure
 
 
-def _sample_section_content(pdf_doc, structure: List[dict]) -> dict:
-    """Sample first page of each section for complexity estimation."""
-    samples = {}
-    for section in structure:
-        start_page = section["page"] - 1
-        if start_page < len(pdf_doc):
-            samples[section["title"]] = pdf_doc[start_page].get_text()[:1500]
-    return samples
+def _iter_header_lines(pdf_doc, total_pages: int, guard: _MemoryGuard) -> Iterator[Tuple[int, list]]:
+    """Yield (page number, [(text, font size, bold)]) for the lines in each page's header band."""
+    for page_num in range(1, total_pages + 1):
+        page = pdf_doc.load_page(page_num - 1)
+        r = page.rect
+        band = page.get_text("dict", clip=(r.x0, r.y0, r.x1, r.y0 + r.height * HEADER_BAND), flags=0)
+        del page
+        guard.tick()
+
+        lines = []
+        for block in band.get("blocks", []):
+            for line in block.get("lines", []):
+                spans = [sp for sp in line.get("spans", []) if sp["text"].strip()]
+                if spans:
+                    text = "".join(sp["text"] for sp in spans).strip()
+                    size = max(sp["size"] for sp in spans)
+                    bold = any(sp["flags"] & _BOLD_FLAG or "bold" in sp["font"].lower() for sp in spans)
+                    lines.append((text, size, bold))
+                if len(lines) >= HEADER_MAX_LINES:
+                    break
+            if len(lines) >= HEADER_MAX_LINES:
+                break
+        yield page_num, lines
+
+
+def _detect_headings(pdf_doc, total_pages: int, guard: _MemoryGuard, skip_lower: set) -> List[dict]:
+    """Chapter headings from the header band of each page, filtered by font cues.
+
+    "Chapter/Unit/Module N" lines count if they stand out from body text (or if
+    nothing in the document does, e.g. single-font PDFs). Numbered lines like
+    "3. Forces" need to stand out - in body-size text they are usually lists.
+    """
+    size_chars = {}
+    candidates = []
+    seen_titles = set()
+
+    for page_num, lines in _iter_header_lines(pdf_doc, total_pages, guard):
+        for text, size, bold in lines:
+            key = round(size, 1)
+            size_chars[key] = size_chars.get(key, 0) + len(text)
+            if not 5 < len(text) < 80 or text.lower() in skip_lower or text in seen_titles:
+                continue
+            match = _HEADING_RE.match(text)
+            if match:
+                # deduplicate running headers
+                seen_titles.add(text)
+                candidates.append((text, page_num, size, bold, match.lastgroup))
+
+    if not candidates:
+        return []
+
+    body_size = max(size_chars, key=size_chars.get)
+    prominent = [size >= body_size * HEADING_SIZE_RATIO or bold for _, _, size, bold, _ in candidates]
+    any_prominent = any(prominent)
+
+    return [
+        {"title": text, "page": page_num}
+        for (text, page_num, _, _, kind), stands_out in zip(candidates, prominent)
+        if stands_out or (kind == "named" and not any_prominent)
+    ]
+
+
+def _iter_section_complexity(pdf_doc, structure: List[dict], subject: str, guard: _MemoryGuard) -> Iterator[Tuple[float, None]]:
+    """Complexity of each section from its first page, streamed in section order."""
+    first_pages = [section["page"] for section in structure]
+    texts = _iter_page_text(pdf_doc, first_pages, guard, limit=1500)
+    pending = next(texts, None)
+    for page in first_pages:
+        text = ""
+        if pending and pending[0] == page:
+            text = pending[1]
+            pending = next(texts, None)
+        yield _estimate_complexity(text, subject), None
+
+
+def _sample_complexity(
+    pdf_doc,
+    structure: List[dict],
+    subject: str,
+    total_pages: int,
+    seed: str,
+    page_budget: int,
+    time_budget: float,
+    guard: _MemoryGuard,
+) -> tuple:
+    """Stratified random page sample (sections are strata) -> per-section complexity estimate.
+
+    Returns ([(mean, standard error) per section], pages read).
+    """
+    rng = random.Random(seed)
+    budget = max(1, min(page_budget, total_pages))
+
+    strata = []
+    for i, section in enumerate(structure):
+        start = section["page"]
+        end = structure[i + 1]["page"] - 1 if i + 1 < len(structure) else total_pages
+        strata.append(range(start, max(start, end) + 1))
+
+    # proportional allocation, at least one page per section while the budget allows
+    sizes = [len(pages) for pages in strata]
+    if budget >= len(strata):
+        alloc = [1] * len(strata)
+        spare = budget - len(strata)
+        total = sum(sizes)
+        for k, size in enumerate(sizes):
+            alloc[k] = min(size, alloc[k] + int(spare * size / total))
+    else:
+        alloc = [0] * len(strata)
+        for k in rng.sample(range(len(strata)), budget):
+            alloc[k] = 1
+    picks = [rng.sample(pages, n) for pages, n in zip(strata, alloc)]
+
+    # read round-robin across sections so a time cut-off still leaves a balanced sample
+    order = [(k, pages[rank]) for rank in range(max(alloc, default=0))
+             for k, pages in enumerate(picks) if rank < len(pages)]
+    section_of = {page: k for k, page in order}
+    scores = [[] for _ in strata]
+    deadline = time.perf_counter() + time_budget if time_budget > 0 else None
+    pages_read = 0
+    for page_num, text in _iter_page_text(pdf_doc, (page for _, page in order), guard, limit=1500):
+        scores[section_of[page_num]].append(_estimate_complexity(text, subject))
+        pages_read += 1
+        if deadline and time.perf_counter() > deadline:
+            break
+
+    # sections with < 2 samples borrow the spread of the whole sample
+    pooled = [c for section in scores for c in section]
+    pooled_mean = sum(pooled) / len(pooled) if pooled else 0.5
+    pooled_sd = _stdev(pooled) if len(pooled) > 1 else 0.2
+
+    estimates = []
+    for sample, size in zip(scores, sizes):
+        n = len(sample)
+        if n == 0:
+            estimates.append((pooled_mean, pooled_sd))
+            continue
+        sd = _stdev(sample) if n > 1 else pooled_sd
+        fpc = math.sqrt((size - n) / (size - 1)) if size > 1 else 0.0
+        estimates.append((sum(sample) / n, sd / math.sqrt(n) * fpc))
+
+    return estimates, pages_read
+
+
+def _stdev(values: List[float]) -> float:
+    mean = sum(values) / len(values)
+    return math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
 
 
 def _estimate_complexity(text: str, subject: str) -> float:
@@ -162,32 +423,25 @@ def _estimate_complexity(text: str, subject: str) -> float:
     return min(0.9, max(0.3, complexity))
 
 
-def _create_topics(
+def _iter_topics(
     structure: List[dict],
-    samples: dict,
+    section_stats: Iterable[Tuple[float, Optional[float]]],
     subject: str,
-    filename: str,
+    doc_id: str,
     total_pages: int,
-    tool_context: ToolContext,
-) -> List[dict]:
-    """Create topics with estimated hours."""
-    all_topics = tool_context.state.get("topics", [])
-    new_topics = []
-    doc_id = hashlib.md5(f"{filename}_{total_pages}".encode()).hexdigest()[:8]
+) -> Iterator[dict]:
+    """Create topics with estimated hours, one per section.
 
-    for i, section in enumerate(structure):
+    section_stats yields (complexity, standard error) per section; the error is
+    None for a full scan, otherwise the topic also gets a 95% hours_range.
+    """
+    for i, (section, (complexity, stderr)) in enumerate(zip(structure, section_stats)):
         title = section["title"][:60]
         start_page = section["page"]
         end_page = structure[i + 1]["page"] - 1 if i + 1 < len(structure) else total_pages
         pages = max(1, end_page - start_page + 1)
 
-        sample_text = samples.get(section["title"], "")
-        complexity = _estimate_complexity(sample_text, subject)
-
-        # Hours = pages × 0.4 (25 min/page) × complexity factor (0.8-1.4)
-        complexity_factor = 0.5 + complexity
-        estimated_hours = round(pages * 0.4 * complexity_factor, 1)
-        estimated_hours = max(0.5, min(estimated_hours, 8.0))
+        estimated_hours = _hours_for(pages, complexity)
 
         topic = {
             "topic_id": f"{doc_id}_{i:02d}",
@@ -197,16 +451,23 @@ def _create_topics(
             "estimated_hours": estimated_hours,
             "complexity": round(complexity, 2),  # Used for peak hours scheduling
         }
-        new_topics.append(topic)
-        all_topics.append(topic)
+        if stderr is not None:
+            low = max(0.3, complexity - 1.96 * stderr)
+            high = min(0.9, complexity + 1.96 * stderr)
+            topic["hours_range"] = [_hours_for(pages, low), _hours_for(pages, high)]
+        yield topic
+
 
-    tool_context.state["topics"] = all_topics
-    return new_topics
+def _hours_for(pages: int, complexity: float) -> float:
+    # Hours = pages × 0.4 (25 min/page) × complexity factor (0.8-1.4)
+    complexity_factor = 0.5 + complexity
+    estimated_hours = round(pages * 0.4 * complexity_factor, 1)
+    return max(0.5, min(estimated_hours, 8.0))
 
 
 def list_topics(tool_context: ToolContext) -> dict:
     """List all topics grouped by subject."""
-    topics = tool_context.state.get("topics", [])
+    topics = get_topics(tool_context.state)
 
     by_subject = {}
     for t in topics:
@@ -234,6 +495,8 @@ def list_topics(tool_context: ToolContext) -> dict:
 
 def clear_topics(tool_context: ToolContext) -> dict:
     """Clear all topics and documents."""
-    tool_context.state["topics"] = []
+    tool_context.state["catalog_docs"] = {}
+    tool_context.state["doc_topics"] = {}
+    tool_context.state["topics"] = []  # pre-doc_topics sessions
     tool_context.state["documents"] = {}
     return {"status": "success", "message": "All topics cleared"}
@@ -2,105 +2,365 @@
 
 from google.adk.tools import ToolContext
 from datetime import datetime, timedelta
+from collections import OrderedDict
+import copy
 import hashlib
+import json
+import threading
+
+from .availability_tools import AvailabilityCalendar, _fmt_time
+from .progress_tools import planning_load, remaining_topics
+from .schedule_solver import solve_schedule
+from .slots import DayGrid, MIN_SESSION_MINUTES, BREAK_MINUTES, new_session
+from .state_utils import update_state, get_topics
+
+
+SCHEDULE_CACHE_SIZE = 64
+
+# fingerprint -> (schedule, tool result); shared by every session in the worker
+_schedule_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
 
 
 def generate_schedule(
     start_date: str,
     end_date: str,
     tool_context: ToolContext,
+    mode: str = "greedy",
+    time_limit_seconds: float = 10.0,
+    horizon_days: int = 0,
 ) -> dict:
-    """Generate study schedule with variety - different topics each session."""
+    """Generate study schedule with variety - different topics each session.
+
+    mode="optimal" runs a min-cost flow solver that also puts hard topics in
+    peak hours, stopping after time_limit_seconds with the best plan so far.
+    horizon_days > 0 (greedy only) plans just the first days; extend_schedule
+    picks up where it stopped.
+    """
     try:
         start = datetime.strptime(start_date, "%Y-%m-%d")
         end = datetime.strptime(end_date, "%Y-%m-%d")
     except ValueError as e:
         return {"status": "error", "message": f"Invalid date: {e}"}
 
-    topics = tool_context.state.get("topics", [])
+    if mode not in ("greedy", "optimal"):
+        return {"status": "error", "message": f"Unknown mode: {mode}. Use 'greedy' or 'optimal'"}
+    if horizon_days and mode != "greedy":
+        return {"status": "error", "message": "horizon_days only works with mode='greedy'"}
+
+    all_topics = get_topics(tool_context.state)
     profile = tool_context.state.get("learner_profile", {})
 
-    if not topics:
+    if not all_topics:
         return {"status": "error", "message": "No topics found. Process documents first."}
 
     # user preferences
     session_profile = profile.get("session_profile", {})
-    max_daily = session_profile.get("max_daily_deep_hours", 6)
-    max_session = session_profile.get("max_session_time", 1.5)
+    daily_minutes = int(round(session_profile.get("max_daily_deep_hours", 6) * 60))
+    session_minutes = int(round(session_profile.get("max_session_time", 1.5) * 60))
+    peak_windows = profile.get("chronotype", {}).get("peak_windows", [])
+
+    # scaling needs the whole period's free time, but that is only a sum of
+    # per-day minutes - sessions are built lazily below. Minutes already done
+    # count towards the plan, so replanning mid-way keeps each topic's share.
+    availability = tool_context.state.get("availability")
+    calendar = AvailabilityCalendar(availability)
+    total_avail = sum(min(daily_minutes, _free_minutes(w)) for _, w in _iter_windows(calendar, start, end))
+    total_needed, total_done = planning_load(all_topics, tool_context.state)
+    scale = min(1.5, (total_avail + total_done) / total_needed) if total_needed > 0 else 1
+
+    # plan only the work left: each topic's scaled minutes minus what was logged
+    topics = remaining_topics(all_topics, tool_context.state, scale)
+    if not topics:
+        return {"status": "success", "days": 0, "message": "Every topic is finished - nothing left to schedule"}
+
+    # any change to topics, profile or availability changes the key, so stale
+    # plans are never served - they just age out of the LRU
+    key = _schedule_fingerprint(topics, profile, availability, start_date, end_date, mode, time_limit_seconds, horizon_days)
+    cached = _cache_get(key)
+    if cached:
+        schedule, result = cached
+        tool_context.state["current_schedule"] = schedule
+        return {**result, "cached": True}
+
+    # topics are already in planned minutes
+    by_subject = _build_items(topics, 1.0)
+    subj_idx = {s: 0 for s in by_subject}
+    last = min(end, start + timedelta(days=horizon_days - 1)) if horizon_days else end
+    days = list(_iter_greedy_days(by_subject, subj_idx, _iter_windows(calendar, start, last), daily_minutes, session_minutes))
+
+    solver_info = None
+    if mode == "optimal":
+        day_windows = dict(_iter_windows(calendar, start, end))
+        day_capacity = {d: min(daily_minutes, _free_minutes(w)) for d, w in day_windows.items()}
+        days, solver_info = solve_schedule(
+            _build_items(topics, 1.0), day_windows, day_capacity, session_minutes,
+            peak_windows, warm_start=days, time_limit=time_limit_seconds,
+        )
+
+    schedule = {
+        "schedule_id": hashlib.md5(f"{start_date}_{end_date}".encode()).hexdigest()[:8],
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": days,
+        "scale": scale,
+        "cursor": _make_cursor(by_subject, subj_idx, last + timedelta(days=1), end, scale, daily_minutes, session_minutes),
+    }
+    schedule["summary"] = _summarize(schedule, len(topics))
+
+    tool_context.state["current_schedule"] = schedule
+
+    summary = schedule["summary"]
+    result = {
+        "status": "success",
+        "days": len(days),
+        "total_hours": summary["total_study_hours"],
+        "hours_by_subject": summary["hours_per_subject"],
+        "message": f"Scheduled {len(topics)} topics across {len(days)} days",
+    }
+    if schedule["cursor"]:
+        result["planned_through"] = summary["planned_through"]
+        result["message"] = (f"Planned {len(days)} study days through {summary['planned_through']}. "
+                             f"Call extend_schedule to plan further.")
+    if solver_info:
+        result["solver"] = solver_info
+
+    _cache_put(key, schedule, result)
+    return result
+
+
+def extend_schedule(tool_context: ToolContext, days: int = 14) -> dict:
+    """Plan the next `days` calendar days of a schedule generated with horizon_days."""
+    schedule = tool_context.state.get("current_schedule", {})
+    if not schedule:
+        return {"status": "error", "message": "No schedule found. Call generate_schedule first."}
+
+    cursor = schedule.get("cursor")
+    if not cursor:
+        return {"status": "success", "days_added": 0, "message": f"Schedule is already planned through {schedule['end_date']}"}
+
+    # resume exactly the topics the schedule was generated with; progress logged
+    # since then only affects the next generate_schedule
+    topics = [t for t in get_topics(tool_context.state) if t["topic_id"] in cursor["remaining"]]
+    by_subject = _build_items(topics, cursor["scale"])
+    items = [t for subj in by_subject.values() for t in subj]
+    if len(items) != len(cursor["remaining"]):
+        return {"status": "error", "message": "Topics changed since this schedule was generated. Call generate_schedule again."}
+    for t in items:
+        t["remaining"] = cursor["remaining"][t["id"]]
+    subj_idx = {s: cursor["subj_idx"].get(s, 0) for s in by_subject}
+
+    first = datetime.strptime(cursor["next_date"], "%Y-%m-%d")
+    end = datetime.strptime(schedule["end_date"], "%Y-%m-%d")
+    last = min(end, first + timedelta(days=max(1, days) - 1))
+
+    calendar = AvailabilityCalendar(tool_context.state.get("availability"))
+    new_days = list(_iter_greedy_days(
+        by_subject, subj_idx, _iter_windows(calendar, first, last), cursor["daily_minutes"], cursor["session_minutes"]))
+
+    schedule["days"].extend(new_days)
+    schedule["cursor"] = _make_cursor(
+        by_subject, subj_idx, last + timedelta(days=1), end,
+        cursor["scale"], cursor["daily_minutes"], cursor["session_minutes"])
+    schedule["summary"] = _summarize(schedule, len(topics))
+    tool_context.state["current_schedule"] = schedule
+
+    summary = schedule["summary"]
+    return {
+        "status": "success",
+        "days_added": len(new_days),
+        "planned_through": summary["planned_through"],
+        "complete": schedule["cursor"] is None,
+        "total_hours": summary["total_study_hours"],
+        "message": f"Added {len(new_days)} study days, planned through {summary['planned_through']}",
+    }
+
+
+def _iter_windows(calendar: AvailabilityCalendar, first: datetime, last: datetime):
+    """(date, free windows) for each day in [first, last], computed on demand."""
+    current = first
+    while current <= last:
+        yield current, calendar.free_windows(current.date())
+        current += timedelta(days=1)
+
+
+def _free_minutes(windows) -> int:
+    return sum(e - s for s, e in windows)
+
+
+def _make_cursor(by_subject, subj_idx, next_date, end, scale, daily_minutes, session_minutes):
+    """Resume point for extend_schedule, or None once the plan is finished."""
+    remaining = {t["id"]: t["remaining"] for subj in by_subject.values() for t in subj}
+    if next_date > end or all(r < MIN_SESSION_MINUTES for r in remaining.values()):
+        return None
+    return {
+        "next_date": next_date.strftime("%Y-%m-%d"),
+        "remaining": remaining,
+        "subj_idx": dict(subj_idx),
+        "scale": scale,
+        "daily_minutes": daily_minutes,
+        "session_minutes": session_minutes,
+    }
+
+
+def _summarize(schedule: dict, total_topics: int) -> dict:
+    mins_by_subj = {}
+    scheduled_ids = set()
+    for d in schedule["days"]:
+        for s in d["sessions"]:
+            mins_by_subj[s["subject"]] = mins_by_subj.get(s["subject"], 0) + s["duration_minutes"]
+            scheduled_ids.add(s["topic_id"])
+    total_minutes = sum(mins_by_subj.values())
 
-    # time allocation calculations
-    total_days = (end - start).days + 1
-    total_avail = total_days * max_daily
-    total_needed = sum(t.get("estimated_hours", 1) for t in topics)
-    scale = min(1.5, total_avail / total_needed) if total_needed > 0 else 1
+    cursor = schedule.get("cursor")
+    if cursor:
+        planned_through = (datetime.strptime(cursor["next_date"], "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+    else:
+        planned_through = schedule["end_date"]
 
-    # organize topics by subject, preserving order
+    return {
+        "total_study_minutes": total_minutes,
+        "total_study_hours": round(total_minutes / 60, 1),
+        "study_days": len(schedule["days"]),
+        "hours_per_subject": {k: round(v / 60, 1) for k, v in mins_by_subj.items()},
+        "topics_scheduled": len(scheduled_ids),
+        "total_topics": total_topics,
+        "planned_through": planned_through,
+    }
+
+
+def _schedule_fingerprint(topics, profile, availability, start_date, end_date, mode, time_limit, horizon_days) -> str:
+    """Stable hash of everything the schedule depends on."""
+    inputs = {
+        "topics": [[t["topic_id"], t.get("subject"), t.get("title"), t.get("estimated_hours"), t.get("complexity")] for t in topics],
+        "profile": profile,
+        "availability": availability or {},
+        "dates": [start_date, end_date],
+        "mode": mode,
+        "time_limit": time_limit if mode == "optimal" else None,
+        "horizon_days": horizon_days,
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _cache_get(key: str):
+    with _cache_lock:
+        entry = _schedule_cache.get(key)
+        if entry is None:
+            _cache_stats["misses"] += 1
+            return None
+        _schedule_cache.move_to_end(key)
+        _cache_stats["hits"] += 1
+    # copies so one session's state never aliases another's
+    return copy.deepcopy(entry)
+
+
+def _cache_put(key: str, schedule: dict, result: dict) -> None:
+    entry = copy.deepcopy((schedule, result))
+    with _cache_lock:
+        _schedule_cache[key] = entry
+        _schedule_cache.move_to_end(key)
+        while len(_schedule_cache) > SCHEDULE_CACHE_SIZE:
+            _schedule_cache.popitem(last=False)
+            _cache_stats["evictions"] += 1
+
+
+def schedule_cache_stats() -> dict:
+    """Hit/miss metrics for the schedule memo cache in this worker."""
+    with _cache_lock:
+        lookups = _cache_stats["hits"] + _cache_stats["misses"]
+        return {
+            **_cache_stats,
+            "size": len(_schedule_cache),
+            "capacity": SCHEDULE_CACHE_SIZE,
+            "hit_rate": round(_cache_stats["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+def clear_schedule_cache() -> None:
+    with _cache_lock:
+        _schedule_cache.clear()
+
+
+def _build_items(topics: list, scale: float) -> dict:
+    """Organize topics by subject, preserving order, with scaled minutes."""
     by_subject = {}
     for t in topics:
         subj = t.get("subject", "General")
         if subj not in by_subject:
             by_subject[subj] = []
+        minutes = int(round(t.get("estimated_hours", 1) * scale * 60))
         by_subject[subj].append({
             "id": t["topic_id"],
             "subject": subj,
             "title": t.get("title", "Topic"),
-            "total_hours": round(t.get("estimated_hours", 1) * scale, 1),
-            "remaining": round(t.get("estimated_hours", 1) * scale, 1),
+            "total_minutes": minutes,
+            "remaining": minutes,
             "complexity": t.get("complexity", 0.5),
         })
+    return by_subject
 
-    subjects = list(by_subject.keys())
-    # flat list for summary tracking
-    all_items = [item for subj in subjects for item in by_subject[subj]]
 
-    # track current topic index per subject
-    subj_idx = {s: 0 for s in subjects}
+def _iter_greedy_days(by_subject: dict, subj_idx: dict, day_windows, daily_minutes: int, max_session: int):
+    """Round-robin subjects day by day, each subject getting its share of the day.
 
-    # build schedule day by day
-    days = []
-    current = start
+    Yields study days one at a time. Progress lives in the topics' "remaining"
+    minutes and subj_idx (current topic per subject), both updated in place, so
+    stopping after any day and resuming on the next date continues the plan.
+    All time is integer minutes; each day's free time is a DayGrid bitset.
+    """
+    subjects = list(by_subject.keys())
 
-    while current <= end:
-        # calculate remaining hours per subject
+    for current, windows in day_windows:
+        # calculate remaining minutes per subject
         subj_remaining = {}
         for s in subjects:
             rem = sum(t["remaining"] for t in by_subject[s])
-            if rem >= 0.25:
+            if rem >= MIN_SESSION_MINUTES:
                 subj_remaining[s] = rem
 
         if not subj_remaining:
-            break
+            return
+
+        day_max = min(daily_minutes, _free_minutes(windows))
+        if day_max < MIN_SESSION_MINUTES:
+            continue
+        grid = DayGrid(windows)
 
-        # allocate daily hours proportionally to each subject's remaining workload
+        # allocate daily minutes proportionally to each subject's remaining workload
         total_remaining = sum(subj_remaining.values())
-        subj_daily_budget = {}
-        for s, rem in subj_remaining.items():
-            subj_daily_budget[s] = round((rem / total_remaining) * max_daily, 2)
+        subj_daily_budget = {s: rem * day_max // total_remaining for s, rem in subj_remaining.items()}
 
         sessions = []
-        day_hours = 0
-        time = 8.0
+        day_minutes = 0
+        cursor = 0
 
         # round-robin through subjects with remaining work
         active_subjects = sorted(subj_remaining.keys(), key=lambda s: -subj_remaining[s])
         subj_time_used = {s: 0 for s in active_subjects}
 
         keep_going = True
-        while day_hours < max_daily and keep_going:
+        while day_minutes < day_max and keep_going:
             keep_going = False
             for s in active_subjects:
-                if day_hours >= max_daily:
+                if day_max - day_minutes < MIN_SESSION_MINUTES:
+                    break
+
+                # next free run long enough for a session
+                slot = grid.next_slot(cursor)
+                if slot is None:
                     break
 
-                budget_left = subj_daily_budget.get(s, 0) - subj_time_used[s]
-                if budget_left < 0.25:
+                budget_left = subj_daily_budget[s] - subj_time_used[s]
+                if budget_left < MIN_SESSION_MINUTES:
                     continue
 
                 # find next topic with remaining time in this subject
                 topic = None
                 while subj_idx[s] < len(by_subject[s]):
                     candidate = by_subject[s][subj_idx[s]]
-                    if candidate["remaining"] >= 0.25:
+                    if candidate["remaining"] >= MIN_SESSION_MINUTES:
                         topic = candidate
                         break
                     subj_idx[s] += 1
@@ -108,73 +368,33 @@ def generate_schedule(
                 if topic is None:
                     continue
 
-                session_hours = min(max_session, topic["remaining"], budget_left, max_daily - day_hours)
-                if session_hours < 0.25:
+                start, run = slot
+                minutes = min(max_session, topic["remaining"], budget_left, day_max - day_minutes, run)
+                if minutes < MIN_SESSION_MINUTES:
                     continue
 
-                # skip lunch
-                if 12 <= time < 13:
-                    time = 13
-
-                sessions.append({
-                    "topic_id": topic["id"],
-                    "subject": topic["subject"],
-                    "title": topic["title"],
-                    "start_time": f"{int(time):02d}:{int((time % 1) * 60):02d}",
-                    "duration_hours": round(session_hours, 1),
-                    "complexity": topic["complexity"],
-                })
+                sessions.append(new_session(topic, start, minutes))
+                grid.occupy(start, minutes + BREAK_MINUTES)
+                cursor = start + minutes + BREAK_MINUTES
 
-                topic["remaining"] -= session_hours
-                day_hours += session_hours
-                subj_time_used[s] += session_hours
-                time += session_hours + 0.25
+                topic["remaining"] -= minutes
+                day_minutes += minutes
+                subj_time_used[s] += minutes
 
                 # advance to next topic if this one is done
-                if topic["remaining"] < 0.25:
+                if topic["remaining"] < MIN_SESSION_MINUTES:
                     subj_idx[s] += 1
 
                 keep_going = True
 
         if sessions:
-            days.append({
+            yield {
                 "date": current.strftime("%Y-%m-%d"),
                 "day_of_week": current.strftime("%A"),
                 "sessions": sessions,
-                "total_hours": round(day_hours, 1),
-            })
-
-        current += timedelta(days=1)
-
-    # summary
-    hrs_by_subj = {}
-    for d in days:
-        for s in d["sessions"]:
-            hrs_by_subj[s["subject"]] = hrs_by_subj.get(s["subject"],0) + s["duration_hours"]
-
-    schedule = {
-        "schedule_id": hashlib.md5(f"{start_date}_{end_date}".encode()).hexdigest()[:8],
-        "start_date": start_date,
-        "end_date": end_date,
-        "days": days,
-        "summary": {
-            "total_study_hours": round(sum(d["total_hours"] for d in days), 1),
-            "study_days": len(days),
-            "hours_per_subject": {k: round(v, 1) for k, v in hrs_by_subj.items()},
-            "topics_scheduled": len([t for t in all_items if t["remaining"] < t["total_hours"] - 0.1]),
-            "total_topics": len(topics),
-        }
-    }
-
-    tool_context.state["current_schedule"] = schedule
-
-    return {
-        "status": "success",
-        "days": len(days),
-        "total_hours": schedule["summary"]["total_study_hours"],
-        "hours_by_subject": hrs_by_subj,
-        "message": f"Scheduled {len(topics)} topics across {len(days)} days"
-    }
+                "total_minutes": day_minutes,
+                "total_hours": round(day_minutes / 60, 2),
+            }
 
 
 def export_schedule_csv(tool_context: ToolContext) -> dict:
@@ -191,11 +411,8 @@ def export_schedule_csv(tool_context: ToolContext) -> dict:
     for day in schedule.get("days", []):
         for s in day["sessions"]:
             title = s["title"][:50].replace(",", ";")
-            start_h, start_m = map(int, s["start_time"].split(":"))
-            duration_min = int(s["duration_hours"] * 60)
-            total_min = start_h * 60 + start_m + duration_min
-            end_time = f"{total_min // 60:02d}:{total_min % 60:02d}"
-            lines.append(f"{day['date']},{day['day_of_week']},{s['start_time']},{end_time},{s['subject']},{title},{duration_min}")
+            start, end = _session_span(s)
+            lines.append(f"{day['date']},{day['day_of_week']},{s['start_time']},{_fmt_time(end)},{s['subject']},{title},{end - start}")
 
     csv_content = "\n".join(lines)
     tool_context.state["schedule_csv"] = csv_content
@@ -216,7 +433,7 @@ def export_schedule_csv(tool_context: ToolContext) -> dict:
             "topics_scheduled": f"{summary.get('topics_scheduled', 0)}/{summary.get('total_topics', 0)}",
             "hours_per_subject": summary.get("hours_per_subject", {}),
         },
-        "message": f"Full schedule saved to {out_path}",
+        "message": _export_message(schedule, out_path),
     }
 
 
@@ -248,14 +465,16 @@ def export_schedule_markdown(tool_context: ToolContext) -> dict:
     lines.extend(["", "## Daily Plan", ""])
 
     for day in schedule.get("days", []):
-        lines.append(f"### {day['day_of_week']}, {day['date']} ({day['total_hours']}h)")
+        day_minutes = sum(end - start for start, end in map(_session_span, day["sessions"]))
+        lines.append(f"### {day['day_of_week']}, {day['date']} ({_fmt_duration(day_minutes)})")
         lines.append("")
         lines.append("| Time | Subject | Topic | Duration |")
         lines.append("|------|---------|-------|----------|")
 
         for s in day["sessions"]:
             title = s["title"][:40] + "..." if len(s["title"]) > 40 else s["title"]
-            dur = f"{s['duration_hours']}h" if s['duration_hours'] >= 1 else f"{int(s['duration_hours']*60)}m"
+            start, end = _session_span(s)
+            dur = _fmt_duration(end - start)
             lines.append(f"| {s['start_time']} | {s['subject']} | {title} | {dur} |")
 
         lines.append("")
@@ -279,7 +498,7 @@ def export_schedule_markdown(tool_context: ToolContext) -> dict:
             "topics_scheduled": f"{summary.get('topics_scheduled', 0)}/{summary.get('total_topics', 0)}",
             "hours_per_subject": summary.get("hours_per_subject", {}),
         },
-        "message": f"Full schedule saved to {out_path}",
+        "message": _export_message(schedule, out_path),
     }
 
 
@@ -290,13 +509,39 @@ def add_exam(subject: str, exam_date: str, tool_context: ToolContext) -> dict:
     except ValueError:
         return {"status": "error", "message": "Use YYYY-MM-DD format"}
 
-    exams = tool_context.state.get("exams", [])
-    for e in exams:
-        if e["subject"] == subject:
-            e["exam_date"] = exam_date
-            tool_context.state["exams"] = exams
-            return {"status": "success", "message": f"Updated {subject} exam to {exam_date}"}
+    # keyed by subject so parallel add_exam calls merge
+    def _add(exams):
+        existed = subject in exams
+        exams[subject] = {"subject": subject, "exam_date": exam_date}
+        return existed
 
-    exams.append({"subject": subject, "exam_date": exam_date})
-    tool_context.state["exams"] = exams
+    if update_state(tool_context, "exams", _add):
+        return {"status": "success", "message": f"Updated {subject} exam to {exam_date}"}
     return {"status": "success", "message": f"Added {subject} exam on {exam_date}"}
+
+
+def _export_message(schedule: dict, out_path: str) -> str:
+    if schedule.get("cursor"):
+        through = schedule["summary"]["planned_through"]
+        return f"Schedule through {through} saved to {out_path}. Call extend_schedule and export again for later days."
+    return f"Full schedule saved to {out_path}"
+
+
+def _session_span(s: dict) -> tuple:
+    """(start, end) minute of a session.
+
+    Schedules saved before sessions carried exact minutes only have
+    start_time and duration_hours; those are converted.
+    """
+    if "end_minute" in s:
+        return s["start_minute"], s["end_minute"]
+    hours, mins = map(int, s["start_time"].split(":"))
+    start = hours * 60 + mins
+    return start, start + int(round(s["duration_hours"] * 60))
+
+
+def _fmt_duration(minutes: int) -> str:
+    hours, mins = divmod(minutes, 60)
+    if not hours:
+        return f"{mins}m"
+    return f"{hours}h {mins:02d}m" if mins else f"{hours}h"
@@ -0,0 +1,203 @@
+"""Study progress - an append-only session log compacted into per-topic totals."""
+
+from typing import List, Tuple
+from google.adk.tools import ToolContext
+from datetime import date as date_cls, datetime
+
+from .slots import MIN_SESSION_MINUTES
+from .state_utils import update_state, get_topics
+
+
+PROGRESS_COMPACT_AT = 50  # log entries kept before they are folded into the snapshot
+CONFIDENCE_SPREAD = 0.3   # confidence 0 -> estimates x1.3, 0.5 -> x1.0, 1 -> x0.7
+
+# state["progress"]:
+#   "log":      {"00000042": entry} - new entries, keyed by sequence number so
+#               parallel calls merge (see state_utils)
+#   "snapshot": {"through": 41, "topics": {topic_id: totals}} - everything up
+#               to "through", folded; older log keys that survive a state merge
+#               are skipped, so nothing is counted twice
+#   "next_seq": next sequence number
+
+
+def log_study_session(
+    topic: str,
+    minutes: int,
+    tool_context: ToolContext,
+    status: str = "completed",
+    date: str = "",
+    finished: bool = False,
+) -> dict:
+    """Record a completed or missed study session for a topic (id or title).
+
+    finished=True marks the topic as done regardless of its remaining estimate.
+    """
+    if status not in ("completed", "missed"):
+        return {"status": "error", "message": f"Unknown status: {status}. Use 'completed' or 'missed'"}
+    if minutes < 0:
+        return {"status": "error", "message": "minutes can't be negative"}
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d").date() if date else date_cls.today()
+    except ValueError:
+        return {"status": "error", "message": "Use YYYY-MM-DD format"}
+
+    topics = get_topics(tool_context.state)
+    match = _find_topic(topics, topic)
+    if isinstance(match, str):
+        return {"status": "error", "message": match}
+
+    entry = {
+        "topic_id": match["topic_id"],
+        "status": status,
+        "minutes": int(minutes),
+        "date": day.isoformat(),
+        "finished": bool(finished),
+    }
+
+    def _append(progress):
+        seq = progress.get("next_seq", 1)
+        progress["next_seq"] = seq + 1
+        progress.setdefault("log", {})[f"{seq:08d}"] = entry
+        if len(progress["log"]) >= PROGRESS_COMPACT_AT:
+            _compact(progress)
+        return topic_progress(progress).get(match["topic_id"], {})
+    totals = update_state(tool_context, "progress", _append)
+
+    done_hours = totals.get("done_minutes", 0) / 60
+    return {
+        "status": "success",
+        "topic": match["title"],
+        "subject": match.get("subject", "General"),
+        "done_hours": round(done_hours, 1),
+        "estimated_hours": match.get("estimated_hours", 1),
+        "finished": totals.get("finished", False),
+        "message": f"Logged {minutes} min {status} for {match['title']}",
+    }
+
+
+def get_progress(tool_context: ToolContext) -> dict:
+    """Hours done and remaining per subject, with finished topic counts."""
+    topics = get_topics(tool_context.state)
+    if not topics:
+        return {"status": "error", "message": "No topics found. Process documents first."}
+
+    # measured against the current plan's scale, so "remaining" agrees with
+    # what generate_schedule would plan next
+    totals = topic_progress(tool_context.state.get("progress", {}))
+    scale = tool_context.state.get("current_schedule", {}).get("scale", 1.0)
+    remaining = {t["topic_id"]: t["estimated_hours"] for t in remaining_topics(topics, tool_context.state, scale)}
+
+    by_subject = {}
+    for t in topics:
+        row = by_subject.setdefault(t.get("subject", "General"), {
+            "done_hours": 0.0, "remaining_hours": 0.0, "missed_sessions": 0, "topics_finished": 0, "topics": 0,
+        })
+        done = totals.get(t["topic_id"], {})
+        row["topics"] += 1
+        row["done_hours"] += done.get("done_minutes", 0) / 60
+        row["missed_sessions"] += done.get("missed", 0)
+        row["remaining_hours"] += remaining.get(t["topic_id"], 0)
+        row["topics_finished"] += t["topic_id"] not in remaining
+
+    for row in by_subject.values():
+        row["done_hours"] = round(row["done_hours"], 1)
+        row["remaining_hours"] = round(row["remaining_hours"], 1)
+
+    return {"status": "success", "by_subject": by_subject}
+
+
+def topic_progress(progress: dict) -> dict:
+    """Per-topic totals: the snapshot plus log entries newer than it."""
+    snapshot = progress.get("snapshot", {})
+    through = snapshot.get("through", 0)
+    totals = {tid: dict(t) for tid, t in snapshot.get("topics", {}).items()}
+    for seq, entry in sorted(progress.get("log", {}).items()):
+        if int(seq) > through:
+            _fold(totals, entry)
+    return totals
+
+
+def planning_load(topics: List[dict], state) -> Tuple[float, float]:
+    """(estimated minutes, minutes done) over the unfinished topics, estimates scaled by subject confidence.
+
+    Estimates are relative weights: a plan gives every topic its estimate x
+    scale, where scale = (free minutes + minutes done) / estimated minutes. The
+    done minutes are part of the plan, so replanning mid-way keeps the scale.
+    """
+    totals = topic_progress(state.get("progress", {}))
+    confidence = state.get("learner_profile", {}).get("subject_confidence", {})
+
+    estimated = done = 0.0
+    for t in topics:
+        progress = totals.get(t["topic_id"], {})
+        if progress.get("finished"):
+            continue
+        estimated += t.get("estimated_hours", 1) * 60 * _confidence_factor(t, confidence)
+        done += progress.get("done_minutes", 0)
+    return estimated, done
+
+
+def remaining_topics(topics: List[dict], state, scale: float = 1.0) -> List[dict]:
+    """Topics with estimated_hours replaced by the work left, scaled by subject confidence.
+
+    Logged minutes are real time, so they are subtracted after the estimate is
+    scaled to planned time (scale, see planning_load) - a topic planned at 1.5x
+    its estimate still has work left after the estimate's worth of study.
+    Finished topics (and ones with less than a minimum session left) are dropped.
+    Reads the compacted snapshot plus a bounded log, so cost is O(topics).
+    """
+    totals = topic_progress(state.get("progress", {}))
+    confidence = state.get("learner_profile", {}).get("subject_confidence", {})
+
+    remaining = []
+    for t in topics:
+        done = totals.get(t["topic_id"], {})
+        if done.get("finished"):
+            continue
+        planned = t.get("estimated_hours", 1) * 60 * _confidence_factor(t, confidence) * scale
+        minutes_left = planned - done.get("done_minutes", 0)
+        if minutes_left < MIN_SESSION_MINUTES:
+            continue
+        remaining.append({**t, "estimated_hours": round(minutes_left / 60, 2)})
+    return remaining
+
+
+def _confidence_factor(topic: dict, confidence: dict) -> float:
+    if topic.get("subject") not in confidence:
+        return 1.0
+    return 1.0 + CONFIDENCE_SPREAD * (1 - 2 * confidence[topic["subject"]])
+
+
+def _fold(totals: dict, entry: dict) -> None:
+    t = totals.setdefault(entry["topic_id"], {"done_minutes": 0, "missed": 0, "sessions": 0, "finished": False})
+    if entry["status"] == "completed":
+        t["done_minutes"] += entry["minutes"]
+        t["sessions"] += 1
+    else:
+        t["missed"] += 1
+    t["finished"] = t["finished"] or entry["finished"]
+    t["last_date"] = max(t.get("last_date", ""), entry["date"])
+
+
+def _compact(progress: dict) -> None:
+    """Fold the whole log into the snapshot and empty it."""
+    progress["snapshot"] = {"through": progress["next_seq"] - 1, "topics": topic_progress(progress)}
+    progress["log"] = {}
+
+
+def _find_topic(topics: List[dict], query: str):
+    """Topic by id, exact title or unique title fragment; an error message otherwise."""
+    q = query.strip().lower()
+    for t in topics:
+        if t["topic_id"] == query:
+            return t
+    exact = [t for t in topics if t.get("title", "").lower() == q]
+    if exact:
+        return exact[0]
+    partial = [t for t in topics if q in t.get("title", "").lower()]
+    if len(partial) == 1:
+        return partial[0]
+    if not partial:
+        return f"No topic matches '{query}'. Use list_topics to see titles."
+    names = ", ".join(t["title"] for t in partial[:5])
+    return f"'{query}' matches {len(partial)} topics ({names}). Be more specific."
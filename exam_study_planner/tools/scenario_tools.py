@@ -0,0 +1,141 @@
+"""What-if comparison of schedule settings without generating full schedules."""
+
+from typing import List, Optional
+from google.adk.tools import ToolContext
+from datetime import datetime, timedelta
+from itertools import product
+
+from .availability_tools import AvailabilityCalendar
+from .progress_tools import planning_load, remaining_topics
+from .slots import BREAK_MINUTES
+from .state_utils import get_exams, get_topics
+
+
+MAX_SCENARIOS = 200
+
+
+def compare_scenarios(
+    tool_context: ToolContext,
+    max_daily_hours: Optional[List[float]] = None,
+    max_session_hours: Optional[List[float]] = None,
+    start_dates: Optional[List[str]] = None,
+    end_dates: Optional[List[str]] = None,
+) -> dict:
+    """Compare every combination of daily hours, session length and start/end dates.
+
+    Omitted lists fall back to the learner profile and the current schedule's
+    dates. Nothing is saved - the current schedule is left untouched.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return {"status": "error", "message": "NumPy not installed. Run: pip install numpy"}
+
+    all_topics = get_topics(tool_context.state)
+    topics = remaining_topics(all_topics, tool_context.state)
+    if not topics:
+        return {"status": "error", "message": "No topics left to schedule. Process documents first."}
+
+    session_profile = tool_context.state.get("learner_profile", {}).get("session_profile", {})
+    current = tool_context.state.get("current_schedule", {})
+
+    daily_opts = max_daily_hours or [session_profile.get("max_daily_deep_hours", 6)]
+    session_opts = max_session_hours or [session_profile.get("max_session_time", 1.5)]
+    start_opts = start_dates or ([current["start_date"]] if current else [])
+    end_opts = end_dates or ([current["end_date"]] if current else [])
+    if not start_opts or not end_opts:
+        return {"status": "error", "message": "Give start_dates and end_dates (no current schedule to default to)"}
+
+    try:
+        starts = [datetime.strptime(d, "%Y-%m-%d").date() for d in start_opts]
+        ends = [datetime.strptime(d, "%Y-%m-%d").date() for d in end_opts]
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid date: {e}"}
+
+    grid = list(product(daily_opts, session_opts, range(len(starts)), range(len(ends))))
+    grid = [g for g in grid if starts[g[2]] <= ends[g[3]]]
+    if not grid:
+        return {"status": "error", "message": "Every start date is after every end date"}
+    if len(grid) > MAX_SCENARIOS:
+        return {"status": "error", "message": f"{len(grid)} scenarios - keep it under {MAX_SCENARIOS}"}
+
+    # one shared day axis covering every scenario; free windows looked up once per day
+    first, last = min(starts), max(ends)
+    n_days = (last - first).days + 1
+    calendar = AvailabilityCalendar(tool_context.state.get("availability"))
+    day_windows = [calendar.free_windows(first + timedelta(days=i)) for i in range(n_days)]
+    width = max(1, max(len(w) for w in day_windows))
+    window_len = np.zeros((n_days, width))
+    for i, windows in enumerate(day_windows):
+        for j, (s, e) in enumerate(windows):
+            window_len[i, j] = e - s
+
+    daily = np.array([g[0] for g in grid], dtype=float)
+    session = np.array([g[1] for g in grid], dtype=float) * 60
+    start_idx = np.array([(starts[g[2]] - first).days for g in grid])
+    end_idx = np.array([(ends[g[3]] - first).days for g in grid])
+
+    # (scenario, day, window) study minutes when packing full sessions + breaks
+    L = window_len[None, :, :]
+    s = session[:, None, None]
+    full = np.floor(L / (s + BREAK_MINUTES))
+    usable = full * s + np.minimum(L - full * (s + BREAK_MINUTES), s)
+    day_cap = np.minimum(usable.sum(axis=2) / 60, daily[:, None])
+
+    day_axis = np.arange(n_days)[None, :]
+    in_range = (day_axis >= start_idx[:, None]) & (day_axis <= end_idx[:, None])
+    day_cap = np.where(in_range, day_cap, 0.0)
+    cum_cap = np.cumsum(day_cap, axis=1)
+
+    # same scale as generate_schedule: done minutes count towards the plan and
+    # are subtracted after scaling
+    needed, done_hours = (m / 60 for m in planning_load(all_topics, tool_context.state))
+    avail = cum_cap[:, -1]
+    scale = np.minimum(1.5, (avail + done_hours) / needed) if needed > 0 else np.ones(len(grid))
+    planned = np.maximum(0.0, needed * scale - done_hours)
+
+    # the scheduler spreads all subjects in proportion, so cumulative capacity
+    # tells how far along every subject is on any given day; a scenario with
+    # no capacity places nothing and never finishes
+    done_at = in_range & (cum_cap >= planned[:, None] - 1e-9)
+    finish_idx = np.where(done_at.any(axis=1), done_at.argmax(axis=1), end_idx)
+    finishes = planned > 0
+    unscheduled = needed * np.maximum(0.0, 1 - scale)
+
+    # subjects with an exam are only covered by what fits before the exam day
+    subjects = list(dict.fromkeys(t.get("subject", "General") for t in topics))
+    exams = {s: e["exam_date"] for s, e in get_exams(tool_context.state).items()}
+    cutoff = np.empty((len(grid), len(subjects)), dtype=int)
+    for j, subj in enumerate(subjects):
+        if subj in exams:
+            exam_idx = (datetime.strptime(exams[subj], "%Y-%m-%d").date() - first).days - 1
+            cutoff[:, j] = np.minimum(end_idx, exam_idx)
+        else:
+            cutoff[:, j] = end_idx
+    by_cutoff = np.where(cutoff >= 0, np.take_along_axis(cum_cap, np.clip(cutoff, 0, n_days - 1), axis=1), 0.0)
+    progress = np.minimum(1.0, (done_hours + by_cutoff) / np.maximum(needed * scale, 1e-9)[:, None])
+    coverage = progress * np.minimum(1.0, scale)[:, None]
+
+    rows = []
+    for k, (d, sess, si, ei) in enumerate(grid):
+        rows.append({
+            "max_daily_hours": d,
+            "max_session_hours": sess,
+            "period": f"{starts[si].isoformat()} to {ends[ei].isoformat()}",
+            "available_hours": round(float(avail[k]), 1),
+            "scale": round(float(scale[k]), 2),
+            "finish_date": (first + timedelta(days=int(finish_idx[k]))).isoformat() if finishes[k] else None,
+            "unscheduled_hours": round(float(unscheduled[k]), 1),
+            "coverage": {subj: f"{coverage[k, j] * 100:.0f}%" for j, subj in enumerate(subjects)},
+        })
+
+    best = max(range(len(rows)), key=lambda k: (coverage[k].min(), finishes[k], -finish_idx[k]))
+
+    return {
+        "status": "success",
+        "scenarios": len(rows),
+        "estimated_hours": round(max(0.0, needed - done_hours), 1),
+        "comparison": rows,
+        "best": rows[best],
+        "message": f"Compared {len(rows)} scenarios. Current schedule unchanged.",
+    }
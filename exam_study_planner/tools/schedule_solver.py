@@ -0,0 +1,353 @@
+"""Optimal scheduling mode - min-cost flow over (topic, day, peak/off-peak slot)."""
+
+from typing import List, Tuple
+import heapq
+import time
+
+from .availability_tools import _subtract
+from .slots import BREAK_MINUTES, new_session
+
+
+UNIT_MINUTES = 15           # flow is solved in quarter-hour units
+BREAK_UNITS = BREAK_MINUTES // UNIT_MINUTES
+PEAK_WINDOW_HOURS = 4       # survey peak options are ~4h windows starting at the given time
+
+# costs per unit of study time (integers keep Dijkstra exact)
+UNSCHEDULED_COST = 100_000  # dropping work is always worse than any placement
+PEAK_COST = 1_000           # x complexity, when a topic is studied outside peak hours
+ORDER_COST = 500            # x fraction of the plan a topic drifts from its place in the syllabus
+
+_INF = float("inf")
+
+
+class _MinCostFlow:
+    """Successive shortest paths with Johnson potentials (all costs start >= 0)."""
+
+    def __init__(self, n: int):
+        self.graph = [[] for _ in range(n)]
+
+    def add_edge(self, u: int, v: int, cap: int, cost: int) -> Tuple[int, int]:
+        self.graph[u].append([v, cap, cost, len(self.graph[v])])
+        self.graph[v].append([u, 0, -cost, len(self.graph[u]) - 1])
+        return u, len(self.graph[u]) - 1
+
+    def flow_on(self, edge: Tuple[int, int]) -> int:
+        u, idx = edge
+        v, _, _, rev = self.graph[u][idx]
+        return self.graph[v][rev][1]
+
+    def residual(self, edge: Tuple[int, int]) -> int:
+        u, idx = edge
+        return self.graph[u][idx][1]
+
+    def push(self, edge: Tuple[int, int], amount: int) -> None:
+        u, idx = edge
+        e = self.graph[u][idx]
+        e[1] -= amount
+        self.graph[e[0]][e[3]][1] += amount
+
+    def run(self, source: int, sink: int, deadline: float) -> bool:
+        """Augment until no path is left. Returns False if the deadline hit first."""
+        graph = self.graph
+        n = len(graph)
+        potential = [0] * n
+
+        while True:
+            if time.perf_counter() > deadline:
+                return False
+
+            dist = [_INF] * n
+            prev = [None] * n
+            dist[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                pu = potential[u]
+                for idx, (v, cap, cost, _) in enumerate(graph[u]):
+                    if cap > 0:
+                        nd = d + cost + pu - potential[v]
+                        if nd < dist[v]:
+                            dist[v] = nd
+                            prev[v] = (u, idx)
+                            heapq.heappush(heap, (nd, v))
+
+            if dist[sink] == _INF:
+                return True
+
+            for v in range(n):
+                if dist[v] < _INF:
+                    potential[v] += dist[v]
+
+            push = _INF
+            v = sink
+            while v != source:
+                u, idx = prev[v]
+                push = min(push, graph[u][idx][1])
+                v = u
+
+            v = sink
+            while v != source:
+                u, idx = prev[v]
+                edge = graph[u][idx]
+                edge[1] -= push
+                graph[v][edge[3]][1] += push
+                v = u
+
+
+def solve_schedule(
+    by_subject: dict,
+    day_windows: dict,
+    day_capacity: dict,
+    max_session: int,
+    peak_windows: List[str],
+    warm_start: list,
+    time_limit: float = 10.0,
+) -> Tuple[list, dict]:
+    """Plan sessions as a min-cost flow, keeping the warm start if it scores better.
+
+    Capacities and max_session are integer minutes, as in the greedy planner.
+
+    Network: source -> topic (its hours) -> (day, peak|off-peak) -> day (daily cap) -> sink,
+    plus topic -> sink at UNSCHEDULED_COST so the flow is always feasible. If the time
+    limit hits mid-solve, the units not routed yet are filled into the cheapest slots
+    with room left, and that plan competes with the warm start.
+    """
+    deadline = time.perf_counter() + max(0.0, time_limit)
+
+    items = [item for subj in by_subject.values() for item in subj]
+    dates = sorted(day_windows)
+    n_days = len(dates)
+    session_units = max(1, max_session // UNIT_MINUTES)
+    peaks = _peak_ranges(peak_windows)
+
+    # where each topic "belongs" in the plan: its midpoint within its subject
+    target = {}
+    for subj_items in by_subject.values():
+        total = sum(t["total_minutes"] for t in subj_items) or 1
+        done = 0
+        for t in subj_items:
+            target[t["id"]] = (done + t["total_minutes"] / 2) / total
+            done += t["total_minutes"]
+
+    # per-day slot classes and their usable units after breaks
+    day_slots = []
+    for d in dates:
+        windows = day_windows[d]
+        peak_segments, off_segments = _split_segments(windows, peaks)
+        cap_units = day_capacity[d] // UNIT_MINUTES
+        day_slots.append({
+            "segments": (peak_segments, off_segments),
+            "caps": (_usable_units(peak_segments, session_units), _usable_units(off_segments, session_units)),
+            "cap": cap_units,
+        })
+
+    # whole units, so every session is a multiple of UNIT_MINUTES (the greedy
+    # planner likewise never schedules a leftover under MIN_SESSION_MINUTES)
+    units = [(t["total_minutes"] + UNIT_MINUTES // 2) // UNIT_MINUTES for t in items]
+
+    # node ids: source, topics, (day, class) pairs, days, sink
+    source = 0
+    topic_node = 1
+    slot_node = topic_node + len(items)
+    day_node = slot_node + 2 * n_days
+    sink = day_node + n_days
+    mcf = _MinCostFlow(sink + 1)
+
+    source_edges, assign_edges, assign_cost, slot_edges, day_edges = {}, {}, {}, {}, {}
+    for i, t in enumerate(items):
+        if units[i] == 0:
+            continue
+        source_edges[i] = mcf.add_edge(source, topic_node + i, units[i], 0)
+        mcf.add_edge(topic_node + i, sink, units[i], UNSCHEDULED_COST)
+        for d in range(n_days):
+            if day_slots[d]["cap"] == 0:
+                continue
+            drift = abs(d / max(1, n_days - 1) - target[t["id"]])
+            for c in (0, 1):
+                if day_slots[d]["caps"][c] == 0:
+                    continue
+                cost = int(ORDER_COST * drift) + (int(PEAK_COST * t["complexity"]) if c == 1 else 0)
+                assign_edges[(i, d, c)] = mcf.add_edge(topic_node + i, slot_node + 2 * d + c, units[i], cost)
+                assign_cost[(i, d, c)] = cost
+
+    for d in range(n_days):
+        for c in (0, 1):
+            if day_slots[d]["caps"][c]:
+                slot_edges[(d, c)] = mcf.add_edge(slot_node + 2 * d + c, day_node + d, day_slots[d]["caps"][c], 0)
+        if day_slots[d]["cap"]:
+            day_edges[d] = mcf.add_edge(day_node + d, sink, day_slots[d]["cap"], 0)
+
+    solved = mcf.run(source, sink, deadline)
+    if not solved:
+        # cheapest (topic, slot) pairs first, as far as the partial flow left room
+        for (i, d, c) in sorted(assign_cost, key=assign_cost.get):
+            path = (source_edges[i], assign_edges[(i, d, c)], slot_edges[(d, c)], day_edges[d])
+            amount = min(mcf.residual(e) for e in path)
+            for e in path:
+                if amount:
+                    mcf.push(e, amount)
+
+    # allocation[d][c] = [(item index, units)], in syllabus order; capacities and
+    # placement share _blocks(), so every allocated unit gets a slot
+    allocation = [[[], []] for _ in range(n_days)]
+    for (i, d, c), edge in assign_edges.items():
+        flow = mcf.flow_on(edge)
+        if flow:
+            allocation[d][c].append((i, flow))
+
+    days = []
+    dropped = 0
+    for d, date in enumerate(dates):
+        sessions = []
+        for c in (0, 1):
+            if allocation[d][c]:
+                placed, lost = _place(allocation[d][c], items, day_slots[d]["segments"][c], session_units)
+                sessions.extend(placed)
+                dropped += lost
+        if sessions:
+            sessions.sort(key=lambda s: s["start_minute"])
+            day_minutes = sum(s["duration_minutes"] for s in sessions)
+            days.append({
+                "date": date.strftime("%Y-%m-%d"),
+                "day_of_week": date.strftime("%A"),
+                "sessions": sessions,
+                "total_minutes": day_minutes,
+                "total_hours": round(day_minutes / 60, 2),
+            })
+
+    solver_cost = plan_cost(days, items, dates, peaks, target)
+    greedy_cost = plan_cost(warm_start, items, dates, peaks, target)
+    use_solver = solver_cost < greedy_cost
+
+    return (days if use_solver else warm_start), {
+        "status": "optimal" if solved else "time_limit",
+        "used": "solver" if use_solver else "greedy",
+        "cost": min(solver_cost, greedy_cost),
+        "greedy_cost": greedy_cost,
+        "unplaced_minutes": dropped * UNIT_MINUTES,
+    }
+
+
+def plan_cost(days: list, items: list, dates: list, peaks: list, target: dict) -> int:
+    """Score a materialized schedule with the same costs the flow minimizes.
+
+    Costs are per 15-minute unit but scored per minute, so plans with
+    arbitrary session lengths (greedy) are compared fairly.
+    """
+    n_days = len(dates)
+    day_index = {d.strftime("%Y-%m-%d"): i for i, d in enumerate(dates)}
+    complexity = {t["id"]: t["complexity"] for t in items}
+
+    cost = 0
+    placed = 0
+    for day in days:
+        d = day_index[day["date"]]
+        for s in day["sessions"]:
+            minutes = s["duration_minutes"]
+            in_peak = any(ps <= s["start_minute"] < pe for ps, pe in peaks)
+            drift = abs(d / max(1, n_days - 1) - target[s["topic_id"]])
+            cost += minutes * (int(ORDER_COST * drift) + (0 if in_peak else int(PEAK_COST * complexity[s["topic_id"]])))
+            placed += minutes
+
+    total = sum(t["total_minutes"] for t in items)
+    return (cost + max(0, total - placed) * UNSCHEDULED_COST) // UNIT_MINUTES
+
+
+def _peak_ranges(peak_windows: List[str]) -> List[Tuple[int, int]]:
+    """Peak windows as sorted, non-overlapping minute ranges."""
+    starts = sorted(int(p.split(":")[0]) * 60 + int(p.split(":")[1]) for p in peak_windows)
+    ranges = []
+    for start in starts:
+        end = min(1440, start + PEAK_WINDOW_HOURS * 60)
+        if ranges and start <= ranges[-1][1]:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def _split_segments(windows, peaks) -> Tuple[list, list]:
+    """Peak and off-peak parts of the free windows.
+
+    Where a segment runs straight into one of the other class, it gives up a
+    break at its end, so sessions placed independently per class never abut.
+    """
+    peak, off = _intersect(windows, peaks), _subtract(windows, peaks)
+    peak_starts = {s for s, _ in peak}
+    off_starts = {s for s, _ in off}
+    peak = [(s, e - BREAK_MINUTES if e in off_starts else e) for s, e in peak]
+    off = [(s, e - BREAK_MINUTES if e in peak_starts else e) for s, e in off]
+    return [g for g in peak if g[1] > g[0]], [g for g in off if g[1] > g[0]]
+
+
+def _intersect(windows, ranges) -> List[Tuple[int, int]]:
+    out = []
+    for ws, we in windows:
+        for rs, re_ in ranges:
+            s, e = max(ws, rs), min(we, re_)
+            if e > s:
+                out.append((s, e))
+    return sorted(out)
+
+
+def _blocks(segments, session_units: int):
+    """(start minute, units) study blocks: up to session_units each, a break between them."""
+    for s, e in segments:
+        cursor = s
+        while e - cursor >= UNIT_MINUTES:
+            units = min(session_units, (e - cursor) // UNIT_MINUTES)
+            yield cursor, units
+            cursor += (units + BREAK_UNITS) * UNIT_MINUTES
+
+
+def _usable_units(segments, session_units: int) -> int:
+    """Study units that fit in the segments - exactly what _place can fill."""
+    return sum(units for _, units in _blocks(segments, session_units))
+
+
+def _place(alloc: list, items: list, segments: list, session_units: int) -> Tuple[list, int]:
+    """Lay allocated units into the segments' blocks, rotating subjects for variety.
+
+    A block can hold pieces of several topics back to back (one sitting no longer
+    than a session). Returns (sessions, units that did not fit).
+    """
+    queues = {}
+    for i, u in sorted(alloc):
+        queues.setdefault(items[i]["subject"], []).append([i, u])
+
+    chunks = []
+    while queues:
+        for subj in list(queues):
+            queue = queues[subj]
+            i, u = queue[0]
+            take = min(u, session_units)
+            chunks.append([i, take])
+            queue[0][1] -= take
+            if queue[0][1] == 0:
+                queue.pop(0)
+            if not queue:
+                del queues[subj]
+
+    sessions = []
+    blocks = _blocks(segments, session_units)
+    start, room = 0, 0
+    for k, (i, u) in enumerate(chunks):
+        while u > 0:
+            if room == 0:
+                block = next(blocks, None)
+                if block is None:
+                    return sessions, u + sum(rest for _, rest in chunks[k + 1:])
+                start, room = block
+            take = min(u, room)
+            minutes = take * UNIT_MINUTES
+            last = sessions[-1] if sessions else None
+            if last and last["topic_id"] == items[i]["id"] and last["end_minute"] == start:
+                sessions[-1] = new_session(items[i], last["start_minute"], last["duration_minutes"] + minutes)
+            else:
+                sessions.append(new_session(items[i], start, minutes))
+            start += minutes
+            room -= take
+            u -= take
+    return sessions, 0
@@ -0,0 +1,76 @@
+"""Integer-minute slot engine - each day is a 1440-bit occupancy bitset."""
+
+from typing import List, Optional, Tuple
+
+from .availability_tools import _fmt_time
+
+
+MINUTES_PER_DAY = 1440
+MIN_SESSION_MINUTES = 15
+BREAK_MINUTES = 15
+
+
+def _mask(start: int, end: int) -> int:
+    """Bits start..end-1 set."""
+    return ((1 << (end - start)) - 1) << start if end > start else 0
+
+
+class DayGrid:
+    """Free minutes of one day as a bitset (bit m set = minute m is free).
+
+    Conflict, gap and next-free checks are a few big-int operations on a
+    1440-bit number instead of walking lists of float intervals.
+    """
+
+    def __init__(self, windows: List[Tuple[int, int]]):
+        self.free = 0
+        for start, end in windows:
+            self.free |= _mask(max(0, start), min(MINUTES_PER_DAY, end))
+
+    def is_free(self, start: int, minutes: int) -> bool:
+        m = _mask(start, start + minutes)
+        return self.free & m == m
+
+    def occupy(self, start: int, minutes: int) -> None:
+        self.free &= ~_mask(start, start + minutes)
+
+    def next_free(self, start: int) -> Optional[int]:
+        """First free minute at or after start, or None."""
+        rest = self.free >> start
+        if not rest:
+            return None
+        return start + (rest & -rest).bit_length() - 1
+
+    def run_length(self, start: int) -> int:
+        """Consecutive free minutes starting at start."""
+        taken = ~(self.free >> start)  # never 0, so the lowest set bit exists
+        return min((taken & -taken).bit_length() - 1, MINUTES_PER_DAY - start)
+
+    def next_slot(self, start: int, minutes: int = MIN_SESSION_MINUTES) -> Optional[Tuple[int, int]]:
+        """First free run of at least `minutes` at or after start, as (start, length)."""
+        while True:
+            start = self.next_free(start)
+            if start is None:
+                return None
+            run = self.run_length(start)
+            if run >= minutes:
+                return start, run
+            start += run
+
+    def free_minutes(self) -> int:
+        return bin(self.free).count("1")
+
+
+def new_session(item: dict, start: int, minutes: int) -> dict:
+    """Session entry with exact minute bounds (plus the display fields exporters show)."""
+    return {
+        "topic_id": item["id"],
+        "subject": item["subject"],
+        "title": item["title"],
+        "start_minute": start,
+        "end_minute": start + minutes,
+        "duration_minutes": minutes,
+        "start_time": _fmt_time(start),
+        "duration_hours": round(minutes / 60, 2),
+        "complexity": item["complexity"],
+    }
@@ -0,0 +1,93 @@
+"""Safe read-modify-write of session state for parallel tool calls.
+
+Two things can drop a write when the model issues parallel function calls:
+
+- Two tools read the same value, change it, and write it back - the second
+  write loses the first one's change. A per-key lock around read-copy-write
+  fixes this within a worker.
+- ADK merges the state deltas of parallel calls with a deep dict merge, so a
+  list value from one call replaces another's, but dict entries with different
+  keys survive. Anything that parallel calls add to (topics, documents, exams,
+  busy blocks) is therefore stored as a dict keyed by a stable id.
+
+Sessions saved before that change still hold lists ("exams", and all topics
+in one "topics" list); they are converted to the keyed form when read.
+"""
+
+from typing import Any, Callable
+import copy
+import threading
+
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key: str) -> threading.Lock:
+    with _locks_guard:
+        if key not in _locks:
+            _locks[key] = threading.Lock()
+        return _locks[key]
+
+
+def update_state(tool_context, key: str, mutate: Callable[[Any], Any], default: Callable[[], Any] = dict) -> Any:
+    """Apply mutate() to a private copy of state[key] and write it back atomically.
+
+    Returns whatever mutate() returns.
+    """
+    with _lock_for(key):
+        value = copy.deepcopy(_upgrade(tool_context.state, key) or default())
+        result = mutate(value)
+        tool_context.state[key] = value
+        return result
+
+
+def set_entry(tool_context, key: str, entry_id: str, entry: Any) -> None:
+    """Atomically set state[key][entry_id] = entry."""
+    def _set(value):
+        value[entry_id] = entry
+    update_state(tool_context, key, _set)
+
+
+def get_topics(state) -> list:
+    """All topics in processing order (stored per document so parallel ingests merge).
+
+    Documents from the shared course catalog are only referenced in state
+    ("catalog_docs"); their topics are decoded from the catalog here.
+    """
+    topics = []
+    from_catalog = set()
+    refs = state.get("catalog_docs", {})
+    if refs:
+        from .catalog_tools import open_catalog
+        catalog = open_catalog()
+        for doc_id, ref in refs.items():
+            if catalog is not None and doc_id in catalog:
+                topics.extend(catalog.topics(doc_id, ref.get("subject", "")))
+                from_catalog.add(doc_id)
+    # a private copy can survive a merge with a parallel call's state delta; the reference wins
+    for doc_id, doc_topics in (_upgrade(state, "doc_topics") or {}).items():
+        if doc_id not in from_catalog:
+            topics.extend(doc_topics)
+    return topics
+
+
+def get_exams(state) -> dict:
+    """Exams keyed by subject."""
+    return _upgrade(state, "exams") or {}
+
+
+def _upgrade(state, key: str) -> Any:
+    """state[key], converting the list shapes older sessions stored."""
+    value = state.get(key)
+    if key == "exams" and isinstance(value, list):
+        return {e["subject"]: e for e in value}
+    if key == "doc_topics" and isinstance(state.get("topics"), list):
+        # topic ids are "<doc_id>_<n>", so the old flat list regroups by document
+        legacy = {}
+        for t in state["topics"]:
+            legacy.setdefault(t["topic_id"].rsplit("_", 1)[0], []).append(t)
+        value = dict(value or {})
+        for doc_id, topics in legacy.items():
+            value.setdefault(doc_id, topics)
+    return value
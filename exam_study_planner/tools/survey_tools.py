@@ -1,5 +1,7 @@
 from google.adk.tools import ToolContext
 
+from .state_utils import set_entry, update_state
+
 
 SURVEY_QUESTIONS = {
     "focus_duration": {
@@ -104,9 +106,7 @@ def process_survey_response(question_id: str, answer: str, tool_context: ToolCon
         return {"status": "invalid_answer", "message": f"Please answer with: {', '.join(valid_answers)}"}
 
     # store response
-    responses = tool_context.state.get("survey_responses", {})
-    responses[question_id] = answer
-    tool_context.state["survey_responses"] = responses
+    set_entry(tool_context, "survey_responses", question_id, answer)
 
     # get next question
     question_ids = list(SURVEY_QUESTIONS.keys())
@@ -159,7 +159,8 @@ def calculate_profile_scores(tool_context: ToolContext) -> dict:
             elif key == "peak_windows":
                 profile["chronotype"]["peak_windows"] = value
 
-    tool_context.state["learner_profile"] = profile
+    # keep anything else already in the profile (e.g. subject confidence)
+    update_state(tool_context, "learner_profile", lambda existing: existing.update(profile))
 
     max_hrs = profile["session_profile"]["max_daily_deep_hours"]
     peak = profile["chronotype"]["peak_windows"][0]
@@ -172,14 +173,12 @@ def calculate_profile_scores(tool_context: ToolContext) -> dict:
 
 
 def update_subject_confidence(subject: str, confidence: float, tool_context: ToolContext) -> dict:
-    """Update confidence for a subject (stored but not currently used in scheduling)."""
-    profile = tool_context.state.get("learner_profile", {})
-    if not profile:
+    """Update confidence (0-1) for a subject; schedules shrink its estimates when high and grow them when low."""
+    if not tool_context.state.get("learner_profile"):
         return {"status": "error", "message": "Complete the survey first."}
 
-    subject_confidence = profile.get("subject_confidence", {})
-    subject_confidence[subject] = max(0.0, min(1.0, confidence))
-    profile["subject_confidence"] = subject_confidence
-    tool_context.state["learner_profile"] = profile
+    def _set(profile):
+        profile.setdefault("subject_confidence", {})[subject] = max(0.0, min(1.0, confidence))
+    update_state(tool_context, "learner_profile", _set)
 
     return {"status": "success", "message": f"Set {subject} confidence to {confidence*100:.0f}%"}
@@ -0,0 +1,79 @@
+"""Ingestion memory stays flat as the page count grows."""
+
+import pytest
+
+fitz = pytest.importorskip("fitz")
+pytest.importorskip("google.adk")
+
+from exam_study_planner.tools import document_tools
+from exam_study_planner.tools.document_tools import _MemoryGuard, _doc_id, _ingest, _rss_mb
+
+
+PAGE_COUNTS = [100, 400, 1600]
+_TICK = _MemoryGuard.tick
+
+
+def _make_pdf(path, pages, chapters=12):
+    """No TOC, so the heading scan has to read every page."""
+    doc = fitz.open()
+    headings = 0
+    body = "\n".join(["The force F = m a is defined as mass times acceleration."] * 30)
+    for p in range(pages):
+        page = doc.new_page()
+        if p % (pages // chapters) == 0 and headings < chapters:
+            headings += 1
+            page.insert_text((72, 72), f"Chapter {headings} Synthetic Topic", fontsize=20)
+        page.insert_text((72, 120), body, fontsize=10)
+    doc.save(str(path))
+    doc.close()
+
+
+def _peak_growth_mb(path, monkeypatch):
+    """Peak RSS above the starting point while _ingest runs, sampled on every page."""
+    samples = []
+
+    def sampling_tick(self):
+        samples.append(_rss_mb())
+        _TICK(self)
+
+    monkeypatch.setattr(_MemoryGuard, "tick", sampling_tick)
+    pdf_doc = fitz.open(str(path))
+    try:
+        start = _rss_mb()
+        _, topics = _ingest(pdf_doc, path.name, "Physics", _doc_id(path.name, len(pdf_doc)), "full", 60, 0)
+        pages = len(pdf_doc)
+    finally:
+        pdf_doc.close()
+    assert topics
+    assert len(samples) >= pages  # the heading scan touched every page
+    return max(samples) - start
+
+
+def test_peak_memory_flat_across_page_counts(tmp_path, monkeypatch):
+    paths = []
+    for pages in PAGE_COUNTS:
+        path = tmp_path / f"book_{pages}.pdf"
+        _make_pdf(path, pages)
+        paths.append(path)
+
+    _peak_growth_mb(paths[0], monkeypatch)  # warm up fonts, caches and imports
+    growth = [_peak_growth_mb(path, monkeypatch) for path in paths]
+
+    # 16x the pages must not mean noticeably more memory
+    assert max(growth) < 64, growth
+    assert growth[-1] - growth[0] < 16, growth
+
+
+def test_guard_rejects_document_over_ceiling(tmp_path, monkeypatch):
+    path = tmp_path / "book.pdf"
+    _make_pdf(path, 64)
+
+    # what EXAM_PLANNER_MAX_RSS_MB sets at import; any running interpreter is above 1 MB
+    monkeypatch.setattr(document_tools, "MAX_RSS_MB", 1)
+
+    pdf_doc = fitz.open(str(path))
+    try:
+        with pytest.raises(MemoryError, match="exceeded 1 MB"):
+            _ingest(pdf_doc, path.name, "Physics", "deadbeef", "full", 60, 0)
+    finally:
+        pdf_doc.close()
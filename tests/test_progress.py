@@ -0,0 +1,40 @@
+"""Logged minutes come off a topic's planned time, not its raw estimate."""
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from exam_study_planner.tools.optimization_tools import generate_schedule
+from exam_study_planner.tools.progress_tools import get_progress, log_study_session
+
+
+class _Context:
+    def __init__(self, state):
+        self.state = state
+
+
+def _planned_minutes(ctx, topic_id):
+    days = ctx.state["current_schedule"]["days"]
+    return sum(s["duration_minutes"] for d in days for s in d["sessions"] if s["topic_id"] == topic_id)
+
+
+def test_replan_keeps_scaled_minutes_left():
+    topics = [{"topic_id": f"doc_{i}", "subject": "Physics", "title": f"Chapter {i}",
+               "estimated_hours": 3, "complexity": 0.5} for i in range(3)]
+    ctx = _Context({"doc_topics": {"doc": topics},
+                    "learner_profile": {"session_profile": {"max_daily_deep_hours": 2}}})
+
+    generate_schedule("2026-01-01", "2026-01-31", ctx)
+    assert ctx.state["current_schedule"]["scale"] == 1.5
+    assert _planned_minutes(ctx, "doc_0") == 270
+
+    # a 3h estimate's worth of study, but the plan gave the topic 4.5h
+    log_study_session("doc_0", 180, ctx, date="2026-01-02")
+    generate_schedule("2026-01-03", "2026-01-31", ctx)
+    assert ctx.state["current_schedule"]["scale"] == 1.5
+    assert _planned_minutes(ctx, "doc_0") == 90
+    assert _planned_minutes(ctx, "doc_1") == 270
+
+    physics = get_progress(ctx)["by_subject"]["Physics"]
+    assert physics["topics_finished"] == 0
+    assert physics["remaining_hours"] == 10.5